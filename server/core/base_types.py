@@ -23,6 +23,9 @@ class ChatMessage:
 
 @dataclass
 class ToolCall:
+    # Declared by hand: dataclass(slots=True) needs Python 3.10
+    __slots__ = ("id", "name", "arguments")
+    
     id: str
     name: str
     arguments: Dict[str, Any]
@@ -2,6 +2,8 @@
 Chat Manager - Orchestrates AI conversations with tool calling loops
 """
 
+import logging
+import re
 from typing import Dict, List, Optional, Any, AsyncIterator
 from dataclasses import dataclass
 from enum import Enum
@@ -10,6 +12,12 @@ from .base_provider import BaseModelProvider
 from .base_types import ChatMessage, ChatResponse, ToolDefinition, ToolCall
 from tools.tool_manager import get_tool_manager
 from memory.chat_memory import get_chat_memory
+from memory.chat_memory_writer import get_chat_memory_writer
+
+logger = logging.getLogger(__name__)
+
+# "call X tools Y times" test command, matched case-insensitively without .lower()
+_TOOL_CMD_RE = re.compile(r"call\s+(\d+)\s+tools?\s+(\d+)\s+times?", re.IGNORECASE)
 
 
 class ConversationState(Enum):
@@ -97,7 +105,7 @@ class ChatManager:
             yield ConversationStep(state=ConversationState.GENERATING)
             
             try:
-                print("Generating AI response...", self.messages, self.available_tools)
+                logger.debug("Generating AI response for %d messages", len(self.messages))
                 # Build optimized context to avoid memory/token limits
                 provider_messages = self._build_provider_context()
                 
@@ -105,7 +113,7 @@ class ChatManager:
                     messages=provider_messages,
                     tools=self.available_tools
                 )
-                print("Generated AI response:", response)
+                logger.debug("Generated AI response: %r", response)
                 
                 # Add AI response to conversation
                 ai_message = ChatMessage(
@@ -127,8 +135,12 @@ class ChatManager:
                     return
                 
                 # AI wants to use tools - ask for user approval
-                print(f"DEBUG: About to yield TOOL_APPROVAL with {len(response.tool_calls)} tool calls")
-                print(f"DEBUG: Tool calls: {[{'id': tc.id, 'name': tc.name} for tc in response.tool_calls]}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "About to yield TOOL_APPROVAL with %d tool calls: %s",
+                        len(response.tool_calls),
+                        [{'id': tc.id, 'name': tc.name} for tc in response.tool_calls]
+                    )
                 
                 yield ConversationStep(
                     state=ConversationState.TOOL_APPROVAL,
@@ -136,7 +148,7 @@ class ChatManager:
                     tool_calls=response.tool_calls
                 )
                 
-                print("DEBUG: Successfully yielded TOOL_APPROVAL step")
+                logger.debug("Successfully yielded TOOL_APPROVAL step")
                 # Wait for user approval (this will be handled by the endpoint)
                 return
                 
@@ -380,9 +392,7 @@ class ChatManager:
             first_message = self.messages[0]
             if first_message.role == "user":
                 # Check if first message contains tool command patterns
-                import re
-                tool_pattern = r"call\s+(\d+)\s+tools?\s+(\d+)\s+times?"
-                if re.search(tool_pattern, first_message.content.lower()):
+                if _TOOL_CMD_RE.search(first_message.content):
                     # Include first message and remove oldest from recent to maintain count
                     recent_messages = [first_message] + recent_messages[1:]
         
@@ -400,18 +410,20 @@ class ChatManager:
                     user_msg = msg.content
             
             if last_user_index == -1 or not user_msg:
-                print("No user message found for saving")
+                logger.debug("No user message found for saving")
                 return
             
             # Build structured conversation data starting from the last user message
             conversation_messages = []
             
             # Add the user message
+            # One timestamp for the whole thread, it is saved in a single row
             from datetime import datetime
+            timestamp = datetime.now().isoformat()
             conversation_messages.append({
                 "role": "user",
                 "content": user_msg,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": timestamp
             })
             
             # Add all messages after the user message
@@ -423,7 +435,7 @@ class ChatManager:
                     message_data = {
                         "role": "assistant",
                         "content": msg.content,
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": timestamp
                     }
                     
                     # Add tool calls if present
@@ -438,7 +450,7 @@ class ChatManager:
                         "role": "tool",
                         "content": msg.content,
                         "tool_call_id": msg.tool_call_id,
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": timestamp
                     })
             
             if conversation_messages:
@@ -457,13 +469,19 @@ class ChatManager:
                 
                 summary = "\n\n".join(summary_parts) if summary_parts else "No response content"
                 
-                print(f"Saving structured conversation: user='{user_msg[:50]}...', {len(conversation_messages)} messages")
-                self.chat_memory.save_message(
+                logger.debug(
+                    "Saving structured conversation: user='%.50s...', %d messages",
+                    user_msg, len(conversation_messages)
+                )
+                # Queued rather than awaited: the writer batches saves from
+                # concurrent conversations into one transaction off the loop
+                get_chat_memory_writer().enqueue(
+                    self.chat_memory,
                     project_id=self.project_id,
                     user_message=structured_data,  # JSON structure in message field
                     ai_response=summary  # Human-readable summary in response field
                 )
             else:
-                print("No conversation messages found for saving")
+                logger.debug("No conversation messages found for saving")
         except Exception as e:
-            print(f"Failed to save final conversation: {e}")
\ No newline at end of file
+            logger.error("Failed to save final conversation: %s", e)
\ No newline at end of file
@@ -3,6 +3,7 @@ Simple MCP-like Session Manager
 Maintains conversation state during tool calling workflows
 """
 
+import logging
 import uuid
 import time
 from typing import Dict, Optional, List
@@ -10,6 +11,8 @@ from dataclasses import dataclass, field
 from core.base_types import ChatMessage
 from core.chat_manager import ChatManager
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class ConversationSession:
@@ -59,7 +62,7 @@ class SessionManager:
         self.sessions[session_id] = session
         self.project_sessions[project_id] = session_id
         
-        print(f"Created session {session_id} for project {project_id}")
+        logger.debug("Created session %s for project %s", session_id, project_id)
         return session_id
     
     def get_session(self, session_id: str) -> Optional[ConversationSession]:
@@ -93,7 +96,7 @@ class SessionManager:
                 del self.project_sessions[session.project_id]
             # Remove session
             del self.sessions[session_id]
-            print(f"Cleaned up session {session_id}")
+            logger.debug("Cleaned up session %s", session_id)
     
     def cleanup_expired_sessions(self, timeout: float = 3600):
         """Clean up expired sessions"""
@@ -106,7 +109,7 @@ class SessionManager:
             self.cleanup_session(session_id)
         
         if expired_sessions:
-            print(f"Cleaned up {len(expired_sessions)} expired sessions")
+            logger.info("Cleaned up %d expired sessions", len(expired_sessions))
     
     def get_session_count(self) -> int:
         """Get number of active sessions"""
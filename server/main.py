@@ -5,6 +5,7 @@ AI CLI Server - FastAPI backend for project management and AI interactions
 """
 
 import os
+import sys
 import logging
 from datetime import datetime
 from typing import List, Optional
@@ -19,11 +20,15 @@ import json
 from pathlib import Path
 
 # Import all route modules
+from utils.orjson_response import ORJSONResponse
+from utils.database import get_db, get_pool
 from routes.basic import router as basic_router
 from routes.projects import router as projects_router
 from routes.chat import router as chat_router
 from routes.settings import router as settings_router
 from routes.chat_memory import router as chat_memory_router
+from memory.chat_memory import get_chat_memory
+from memory.chat_memory_writer import get_chat_memory_writer
 
 # Import tools
 from tools.tool_manager import get_tool_manager
@@ -39,15 +44,6 @@ from tools.shell.run_command_tool import RunCommandTool
 # from tools.memory.save_memory_tool import SaveMemoryTool
 # from tools.memory.retrieve_memory_tool import RetrieveMemoryTool
 
-# Database setup
-DB_PATH = Path.home() / ".ai-cli" / "ai_cli.db"
-
-def get_db():
-    """Get database connection"""
-    DB_PATH.parent.mkdir(exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
 def init_database():
     """Initialize database with required tables"""
@@ -67,6 +63,12 @@ def init_database():
             )
         """)
         
+        # Serves the project list's ORDER BY created_at DESC without a sort
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_projects_created
+            ON projects(created_at DESC)
+        """)
+        
         conn.execute("""
             CREATE TABLE IF NOT EXISTS chat_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -74,7 +76,7 @@ def init_database():
                 message TEXT NOT NULL,
                 response TEXT NOT NULL,
                 timestamp TEXT NOT NULL,
-                FOREIGN KEY (project_id) REFERENCES projects (id)
+                FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
             )
         """)
         
@@ -141,15 +143,28 @@ async def lifespan(app: FastAPI):
     )
     
     init_database()
+    # ChatMemory migrates an existing chat_history (cascading deletes, search
+    # index) when it is built, so build it before serving any request
+    get_chat_memory()
     init_tools()
+    get_chat_memory_writer().start()
     yield
+    
+    await get_chat_memory_writer().stop()
+    # The Gemini client exists only if a request loaded that provider
+    gemini_provider = sys.modules.get("providers.gemini_provider")
+    if gemini_provider is not None:
+        await gemini_provider.close_http_client()
+    get_pool().close()
 
 # FastAPI app
 app = FastAPI(
     title="AI CLI Server",
     description="Backend server for AI-powered CLI tool",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Serialize every JSON response with orjson instead of stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -3,16 +3,171 @@ Chat Memory Management for Project Conversations
 Handles saving, loading, and managing chat history for projects
 """
 
+import itertools
+import queue
+import re
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Optional, Any
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import cache, lru_cache
+from typing import List, Dict, Optional, Any, Iterator, Tuple
 from pathlib import Path
 from dataclasses import dataclass
+from datetime import datetime
+
+
+# SQL kept as module constants so every call hits sqlite3's statement cache.
+# Timestamps are stamped in Python with datetime.now().isoformat() (local
+# time, microseconds), the format of existing rows and of SSE frames. History
+# is ordered by the monotonically increasing id (insertion order) rather than
+# by the text timestamp, so the (project_id, id) index covers the sort
+_INSERT_SQL = """
+    INSERT INTO chat_history (project_id, message, response, timestamp)
+    VALUES (?, ?, ?, ?)
+"""
+
+_SELECT_HISTORY_SQL = """
+    SELECT id, project_id, message, response, timestamp
+    FROM chat_history 
+    WHERE project_id = ? 
+    ORDER BY id ASC
+"""
+
+_SELECT_HISTORY_LIMIT_SQL = _SELECT_HISTORY_SQL + " LIMIT ?"
+
+# Keyset page of history: the rows after a given id, in id order
+_SELECT_HISTORY_PAGE_SQL = """
+    SELECT id, project_id, message, response, timestamp
+    FROM chat_history 
+    WHERE project_id = ? AND id > ?
+    ORDER BY id ASC
+    LIMIT ?
+"""
+
+# Newest N rows, re-sorted oldest first by SQLite rather than in Python
+_SELECT_RECENT_SQL = """
+    SELECT id, project_id, message, response, timestamp
+    FROM (
+        SELECT id, project_id, message, response, timestamp
+        FROM chat_history 
+        WHERE project_id = ? 
+        ORDER BY id DESC 
+        LIMIT ?
+    ) sub
+    ORDER BY id ASC
+"""
+
+_SEARCH_SQL = """
+    SELECT ch.id, ch.project_id, ch.message, ch.response, ch.timestamp
+    FROM chat_history_fts
+    JOIN chat_history ch ON ch.id = chat_history_fts.rowid
+    WHERE ch.project_id = ? AND chat_history_fts MATCH ?
+    ORDER BY bm25(chat_history_fts), ch.id DESC
+    LIMIT ?
+"""
+
+# The FTS tokenizer drops punctuation, so queries without any word characters
+# keep the substring search (newest first); an empty query matches every row
+_SEARCH_LIKE_SQL = """
+    SELECT id, project_id, message, response, timestamp
+    FROM chat_history
+    WHERE project_id = ? AND (message LIKE ? OR response LIKE ?)
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+_WORD_RE = re.compile(r"\w")
 
 
-@dataclass
+# Full chat schema, created in one transaction by ChatMemory on startup.
+# The table definition matches main.init_database so either may run first
+_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS chat_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_id INTEGER NOT NULL,
+        message TEXT NOT NULL,
+        response TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+    );
+    
+    CREATE INDEX IF NOT EXISTS idx_chat_history_project_timestamp 
+    ON chat_history(project_id, timestamp DESC);
+    
+    CREATE INDEX IF NOT EXISTS idx_chat_history_project_id 
+    ON chat_history(project_id, id DESC);
+    
+    -- Full-text index over message/response for search_messages; porter
+    -- stemming lets "parsing" find "parse"
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts USING fts5(
+        message, response,
+        content='chat_history', content_rowid='id',
+        tokenize="porter unicode61 remove_diacritics 2"
+    );
+    
+    CREATE TRIGGER IF NOT EXISTS chat_history_fts_ai AFTER INSERT ON chat_history BEGIN
+        INSERT INTO chat_history_fts(rowid, message, response)
+        VALUES (new.id, new.message, new.response);
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS chat_history_fts_ad AFTER DELETE ON chat_history BEGIN
+        INSERT INTO chat_history_fts(chat_history_fts, rowid, message, response)
+        VALUES ('delete', old.id, old.message, old.response);
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS chat_history_fts_au AFTER UPDATE ON chat_history BEGIN
+        INSERT INTO chat_history_fts(chat_history_fts, rowid, message, response)
+        VALUES ('delete', old.id, old.message, old.response);
+        INSERT INTO chat_history_fts(rowid, message, response)
+        VALUES (new.id, new.message, new.response);
+    END;
+    
+    -- Per-project message counters maintained by triggers, so counting
+    -- is a single-row lookup instead of an index range scan
+    CREATE TABLE IF NOT EXISTS project_message_counts (
+        project_id INTEGER PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    );
+    
+    CREATE TRIGGER IF NOT EXISTS chat_history_count_ai AFTER INSERT ON chat_history BEGIN
+        INSERT INTO project_message_counts(project_id, count) VALUES (new.project_id, 1)
+        ON CONFLICT(project_id) DO UPDATE SET count = count + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS chat_history_count_ad AFTER DELETE ON chat_history BEGIN
+        UPDATE project_message_counts SET count = count - 1
+        WHERE project_id = old.project_id;
+    END;
+"""
+
+# Rebuilds a chat_history created before its foreign key cascaded on project
+# delete (SQLite can't alter a constraint in place). Ids are kept, so the FTS
+# index stays valid; dropping the table drops its indexes and triggers, which
+# _SCHEMA_SQL then recreates in the same transaction
+_CASCADE_MIGRATION_SQL = """
+    CREATE TABLE chat_history_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_id INTEGER NOT NULL,
+        message TEXT NOT NULL,
+        response TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+    );
+    INSERT INTO chat_history_new (id, project_id, message, response, timestamp)
+    SELECT id, project_id, message, response, timestamp FROM chat_history;
+    DROP TABLE chat_history;
+    ALTER TABLE chat_history_new RENAME TO chat_history;
+"""
+
+
+@dataclass(frozen=True)
 class ChatMessage:
-    """Represents a single chat message with metadata"""
+    """Represents a single chat message with metadata (immutable, safe to cache)"""
+    # Declared by hand: dataclass(slots=True) needs Python 3.10
+    __slots__ = ("id", "project_id", "message", "response", "timestamp")
+    
     id: int
     project_id: int
     message: str
@@ -36,32 +191,172 @@ class ChatMemory:
     Separate from AI memory tools - this is just conversation persistence
     """
     
-    def __init__(self, db_path: Optional[Path] = None):
-        """Initialize chat memory with database connection"""
+    # WAL mode is persisted in the database file header, so it only needs
+    # to be switched on once per database file per process
+    _wal_initialized: set = set()
+    _wal_lock = threading.Lock()
+    
+    def __init__(self, db_path: Optional[Path] = None, reader_pool_size: int = 4, cache_ttl: float = 5.0):
+        """
+        Initialize chat memory with a writer connection and a reader pool
+        
+        Args:
+            db_path: Path to the SQLite database file
+            reader_pool_size: Number of read-only connections kept open
+            cache_ttl: Seconds a cached read may miss writes made outside this instance;
+                0 turns caching of reads off
+        """
         if db_path is None:
             db_path = Path.home() / ".ai-cli" / "ai_cli.db"
         
         self.db_path = db_path
+        self.db_path.parent.mkdir(exist_ok=True)
+        
+        # Connections are long-lived so SQLite's per-connection page cache
+        # survives across calls: one mutex-guarded writer plus N readers
+        self._writer_lock = threading.Lock()
+        self._writer_conn = self._create_connection()
+        self._writer_cursor = self._writer_conn.cursor()
+        self._reader_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=reader_pool_size)
+        
+        # Every ":memory:" connection is a separate database, so in-memory
+        # stores route reads through the writer instead of a reader pool
+        if not self._is_in_memory():
+            for _ in range(reader_pool_size):
+                self._reader_pool.put(self._create_connection(reader=True))
+        
+        # Per-project write counters; cached reads are keyed on the counter so
+        # any write to a project makes its older cache entries unreachable.
+        # Writes from other processes don't bump it, so keys also carry the
+        # current cache_ttl window, bounding how long those stay unseen
+        self.cache_ttl = cache_ttl
+        self._uncached_windows = itertools.count()
+        self._versions: Dict[int, int] = defaultdict(int)
+        self._recent_history_cache = lru_cache(maxsize=256)(self._load_recent_history)
+        self._message_count_cache = lru_cache(maxsize=256)(self._load_message_count)
+        
         self._ensure_database_exists()
     
+    def _cache_window(self) -> int:
+        """Index of the current cache_ttl window, part of every cached read key"""
+        if self.cache_ttl <= 0:
+            # A fresh index per read, so no cached entry is ever hit
+            return next(self._uncached_windows)
+        return int(time.monotonic() // self.cache_ttl)
+    
+    def _is_in_memory(self) -> bool:
+        """Whether this store is backed by an in-memory database"""
+        return str(self.db_path) == ":memory:"
+    
     def _ensure_database_exists(self):
-        """Ensure the database and chat_history table exist"""
-        self.db_path.parent.mkdir(exist_ok=True)
-        
-        with self._get_connection() as conn:
-            # Create index for better performance on project_id queries
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_chat_history_project_timestamp 
-                ON chat_history(project_id, timestamp DESC)
-            """)
-            conn.commit()
+        """Ensure the chat_history table and its indexes, FTS and counters exist"""
+        with self._acquire_writer() as conn:
+            existing = dict(
+                conn.execute(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'table' "
+                    "AND name IN ('chat_history', 'chat_history_fts', 'project_message_counts')"
+                )
+            )
+            
+            script = [_SCHEMA_SQL]
+            if "chat_history" in existing and "ON DELETE CASCADE" not in existing["chat_history"]:
+                script.insert(0, _CASCADE_MIGRATION_SQL)
+            # An index built without stemming is dropped and rebuilt below
+            if "porter" not in existing.get("chat_history_fts", "porter"):
+                script.insert(0, "DROP TABLE chat_history_fts;")
+                del existing["chat_history_fts"]
+            # Index rows written before the FTS table existed
+            if "chat_history_fts" not in existing:
+                script.append("INSERT INTO chat_history_fts(chat_history_fts) VALUES ('rebuild');")
+            if "project_message_counts" not in existing:
+                script.append("""
+                    INSERT INTO project_message_counts(project_id, count)
+                    SELECT project_id, COUNT(*) FROM chat_history GROUP BY project_id;
+                """)
+            
+            # One script, one transaction, on the writer connection
+            conn.executescript("BEGIN;\n" + "\n".join(script) + "\nCOMMIT;")
     
-    def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection with row factory"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def _create_connection(self, reader: bool = False) -> sqlite3.Connection:
+        """Open a pooled connection with tuned PRAGMAs (rows are plain tuples)"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            # Readers manage their own BEGIN DEFERRED / COMMIT
+            isolation_level=None if reader else ""
+        )
+        self._apply_pragmas(conn)
         return conn
     
+    def _apply_pragmas(self, conn: sqlite3.Connection):
+        """Apply per-connection PRAGMAs (WAL, relaxed fsync, larger caches)"""
+        db_key = str(self.db_path)
+        if not self._is_in_memory():
+            with self._wal_lock:
+                if db_key not in ChatMemory._wal_initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    ChatMemory._wal_initialized.add(db_key)
+        
+        # NORMAL is safe in WAL mode and drops one fsync per commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA mmap_size=268435456")
+    
+    @contextmanager
+    def _acquire_writer(self) -> Iterator[sqlite3.Connection]:
+        """Borrow the single writer connection, rolling back on error"""
+        with self._writer_lock:
+            try:
+                yield self._writer_conn
+            except Exception:
+                self._writer_conn.rollback()
+                raise
+    
+    @contextmanager
+    def _acquire_reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a reader connection from the pool inside a deferred transaction
+        
+        When every pooled reader is in use (e.g. held by slow history
+        iterators) a fresh one is opened instead of blocking, and closed on
+        return if the pool is already full again.
+        """
+        if self._is_in_memory():
+            with self._acquire_writer() as conn:
+                yield conn
+            return
+        
+        try:
+            conn = self._reader_pool.get_nowait()
+        except queue.Empty:
+            conn = self._create_connection(reader=True)
+        try:
+            conn.execute("BEGIN DEFERRED")
+            try:
+                yield conn
+            finally:
+                conn.execute("COMMIT")
+        finally:
+            try:
+                self._reader_pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    def checkpoint(self):
+        """Run a passive WAL checkpoint to fold the WAL back into the database"""
+        with self._acquire_writer() as conn:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def close(self):
+        """Close the writer and all pooled reader connections"""
+        with self._writer_lock:
+            self._writer_conn.close()
+        
+        while not self._reader_pool.empty():
+            self._reader_pool.get_nowait().close()
+    
     def save_message(self, project_id: int, user_message: str, ai_response: str) -> int:
         """
         Save a chat message pair to the database
@@ -74,18 +369,44 @@ class ChatMemory:
         Returns:
             int: ID of the saved chat message
         """
-        timestamp = datetime.now().isoformat()
-        
-        with self._get_connection() as conn:
-            cursor = conn.execute("""
-                INSERT INTO chat_history (project_id, message, response, timestamp)
-                VALUES (?, ?, ?, ?)
-            """, (project_id, user_message, ai_response, timestamp))
+        with self._acquire_writer() as conn:
+            cursor = self._writer_cursor
+            cursor.execute(_INSERT_SQL, (project_id, user_message, ai_response, datetime.now().isoformat()))
             
             message_id = cursor.lastrowid
             conn.commit()
+            self._versions[project_id] += 1
             return message_id
     
+    def save_messages(self, project_id: int, pairs: List[Tuple[str, str]]) -> int:
+        """
+        Save several chat message pairs in a single transaction
+        
+        Args:
+            project_id: The project these conversations belong to
+            pairs: (user_message, ai_response) tuples in chronological order
+            
+        Returns:
+            int: Number of chat messages saved
+        """
+        if not pairs:
+            return 0
+        
+        # One timestamp for the whole batch
+        timestamp = datetime.now().isoformat()
+        rows = [
+            (project_id, user_message, ai_response, timestamp)
+            for user_message, ai_response in pairs
+        ]
+        
+        with self._acquire_writer() as conn:
+            # One transaction and one commit for the whole batch
+            conn.execute("BEGIN")
+            self._writer_cursor.executemany(_INSERT_SQL, rows)
+            conn.commit()
+            self._versions[project_id] += 1
+            return len(rows)
+    
     def get_project_history(self, project_id: int, limit: Optional[int] = None) -> List[ChatMessage]:
         """
         Get chat history for a specific project
@@ -97,30 +418,55 @@ class ChatMemory:
         Returns:
             List[ChatMessage]: List of chat messages ordered by timestamp (oldest first)
         """
-        with self._get_connection() as conn:
-            query = """
-                SELECT id, project_id, message, response, timestamp
-                FROM chat_history 
-                WHERE project_id = ? 
-                ORDER BY timestamp ASC
-            """
-            
-            if limit:
-                query += f" LIMIT {limit}"
+        return list(self.iter_project_history(project_id, limit))
+    
+    def iter_project_history(self, project_id: int, limit: Optional[int] = None) -> Iterator[ChatMessage]:
+        """
+        Stream chat history for a project one message at a time
+        
+        The reader connection is held until the iterator is exhausted or
+        closed; meanwhile other reads open a spare connection if the pool
+        runs dry.
+        
+        Args:
+            project_id: The project to get history for
+            limit: Maximum number of messages to yield (None for all)
             
-            cursor = conn.execute(query, (project_id,))
-            rows = cursor.fetchall()
+        Yields:
+            ChatMessage: Chat messages ordered by timestamp (oldest first)
+        """
+        if limit:
+            query, params = _SELECT_HISTORY_LIMIT_SQL, (project_id, limit)
+        else:
+            query, params = _SELECT_HISTORY_SQL, (project_id,)
+        
+        with self._acquire_reader() as conn:
+            cursor = conn.execute(query, params)
+            try:
+                for row in cursor:
+                    yield ChatMessage(row[0], row[1], row[2], row[3], row[4])
+            finally:
+                # Also reached on an early close(), which hands the reader back
+                cursor.close()
+    
+    def get_history_page(self, project_id: int, after_id: int = 0, limit: int = 100) -> List[ChatMessage]:
+        """
+        Get one page of chat history for a project
+        
+        Each page is read under its own short reader checkout, so a caller
+        paging through a long history never holds a connection between pages.
+        
+        Args:
+            project_id: The project to get history for
+            after_id: Return messages with an id greater than this one
+            limit: Maximum number of messages to return
             
-            return [
-                ChatMessage(
-                    id=row["id"],
-                    project_id=row["project_id"],
-                    message=row["message"],
-                    response=row["response"],
-                    timestamp=row["timestamp"]
-                )
-                for row in rows
-            ]
+        Returns:
+            List[ChatMessage]: Chat messages ordered by timestamp (oldest first)
+        """
+        with self._acquire_reader() as conn:
+            rows = conn.execute(_SELECT_HISTORY_PAGE_SQL, (project_id, after_id, limit)).fetchall()
+        return [ChatMessage(row[0], row[1], row[2], row[3], row[4]) for row in rows]
     
     def get_recent_history(self, project_id: int, limit: int = 50) -> List[ChatMessage]:
         """
@@ -133,30 +479,17 @@ class ChatMemory:
         Returns:
             List[ChatMessage]: List of recent messages ordered by timestamp (oldest first)
         """
-        with self._get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT id, project_id, message, response, timestamp
-                FROM chat_history 
-                WHERE project_id = ? 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            """, (project_id, limit))
-            
-            rows = cursor.fetchall()
-            
-            # Reverse to get oldest first (chronological order for display)
-            messages = [
-                ChatMessage(
-                    id=row["id"],
-                    project_id=row["project_id"],
-                    message=row["message"],
-                    response=row["response"],
-                    timestamp=row["timestamp"]
-                )
-                for row in reversed(rows)
-            ]
-            
-            return messages
+        return list(self._recent_history_cache(
+            project_id, limit, self._versions[project_id], self._cache_window()
+        ))
+    
+    def _load_recent_history(self, project_id: int, limit: int, version: int, window: int) -> Tuple[ChatMessage, ...]:
+        """Query recent history; memoized per (project_id, limit, version, window)"""
+        with self._acquire_reader() as conn:
+            return tuple(
+                ChatMessage(row[0], row[1], row[2], row[3], row[4])
+                for row in conn.execute(_SELECT_RECENT_SQL, (project_id, limit))
+            )
     
     def clear_project_history(self, project_id: int) -> int:
         """
@@ -168,13 +501,14 @@ class ChatMemory:
         Returns:
             int: Number of messages deleted
         """
-        with self._get_connection() as conn:
+        with self._acquire_writer() as conn:
             cursor = conn.execute(
                 "DELETE FROM chat_history WHERE project_id = ?", 
                 (project_id,)
             )
             deleted_count = cursor.rowcount
             conn.commit()
+            self._versions[project_id] += 1
             return deleted_count
     
     def get_message_count(self, project_id: int) -> int:
@@ -187,12 +521,17 @@ class ChatMemory:
         Returns:
             int: Number of messages in project history
         """
-        with self._get_connection() as conn:
+        return self._message_count_cache(project_id, self._versions[project_id], self._cache_window())
+    
+    def _load_message_count(self, project_id: int, version: int, window: int) -> int:
+        """Count messages for a project; memoized per (project_id, version, window)"""
+        with self._acquire_reader() as conn:
             cursor = conn.execute(
-                "SELECT COUNT(*) as count FROM chat_history WHERE project_id = ?",
+                "SELECT count FROM project_message_counts WHERE project_id = ?",
                 (project_id,)
             )
-            return cursor.fetchone()["count"]
+            row = cursor.fetchone()
+            return row[0] if row else 0
     
     def delete_message(self, message_id: int) -> bool:
         """
@@ -204,57 +543,72 @@ class ChatMemory:
         Returns:
             bool: True if message was deleted, False if not found
         """
-        with self._get_connection() as conn:
+        with self._acquire_writer() as conn:
+            row = conn.execute(
+                "SELECT project_id FROM chat_history WHERE id = ?",
+                (message_id,)
+            ).fetchone()
+            if not row:
+                return False
+            
             cursor = conn.execute(
                 "DELETE FROM chat_history WHERE id = ?",
                 (message_id,)
             )
             deleted = cursor.rowcount > 0
             conn.commit()
+            self._versions[row[0]] += 1
             return deleted
     
+    def invalidate_project(self, project_id: int):
+        """
+        Drop cached reads for a project
+        
+        Call this after modifying a project's chat_history outside ChatMemory
+        
+        Args:
+            project_id: The project whose cached history is stale
+        """
+        with self._writer_lock:
+            self._versions[project_id] += 1
+    
     def search_messages(self, project_id: int, query: str, limit: int = 20) -> List[ChatMessage]:
         """
         Search for messages containing specific text
         
+        Queries with words use the full-text index: they match whole words as
+        a phrase, with stemming ("parse" finds "parsing") and a prefix match
+        on the last word ("pars" finds "parser"), but not text inside a word
+        ("ponse" does not find "response"). An empty query returns the newest
+        messages; a query with no word characters (e.g. "?!") is matched as a
+        substring of the message or response, newest first.
+        
         Args:
             project_id: The project to search in
             query: Text to search for
             limit: Maximum number of results
             
         Returns:
-            List[ChatMessage]: Messages containing the search query
+            List[ChatMessage]: Messages containing the search query, best matches first
         """
-        with self._get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT id, project_id, message, response, timestamp
-                FROM chat_history 
-                WHERE project_id = ? AND (message LIKE ? OR response LIKE ?)
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            """, (project_id, f"%{query}%", f"%{query}%", limit))
-            
-            rows = cursor.fetchall()
-            
+        if not _WORD_RE.search(query):
+            pattern = f"%{query}%"
+            sql, params = _SEARCH_LIKE_SQL, (project_id, pattern, pattern, limit)
+        else:
+            # Search the query as a single phrase (prefix-matching the last word)
+            # so user input can't be interpreted as FTS5 query syntax
+            match_query = '"' + query.replace('"', '""') + '"*'
+            sql, params = _SEARCH_SQL, (project_id, match_query, limit)
+        
+        with self._acquire_reader() as conn:
             return [
-                ChatMessage(
-                    id=row["id"],
-                    project_id=row["project_id"],
-                    message=row["message"],
-                    response=row["response"],
-                    timestamp=row["timestamp"]
-                )
-                for row in rows
+                ChatMessage(row[0], row[1], row[2], row[3], row[4])
+                for row in conn.execute(sql, params)
             ]
 
 
-# Singleton instance for global use
-_chat_memory_instance = None
-
-
+# Singleton instance for global use, created on first call
+@cache
 def get_chat_memory() -> ChatMemory:
     """Get the global ChatMemory instance"""
-    global _chat_memory_instance
-    if _chat_memory_instance is None:
-        _chat_memory_instance = ChatMemory()
-    return _chat_memory_instance
\ No newline at end of file
+    return ChatMemory()
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Chat Memory Writer
+Queues chat memory writes from async code and flushes them in batches,
+so consecutive conversations share one SQLite transaction
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from functools import cache
+from typing import Dict, List, Optional, Tuple
+
+from .chat_memory import ChatMemory
+
+logger = logging.getLogger(__name__)
+
+
+class ChatMemoryWriter:
+    """
+    Single worker coroutine that drains a queue of pending chat messages
+
+    Each flush waits briefly for more messages to arrive, then writes
+    everything queued for a project with one save_messages() call in a
+    worker thread, keeping the event loop free while SQLite commits.
+    """
+
+    def __init__(self, max_batch: int = 100, flush_delay: float = 0.02):
+        """
+        Initialize the writer (the worker starts on first use)
+
+        Args:
+            max_batch: Maximum number of messages written per flush
+            flush_delay: Seconds to wait for more messages before flushing
+        """
+        self.max_batch = max_batch
+        self.flush_delay = flush_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the worker coroutine on the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    def enqueue(self, memory: ChatMemory, project_id: int, user_message: str, ai_response: str):
+        """
+        Queue a chat message pair to be saved
+
+        Args:
+            memory: ChatMemory to write the message to
+            project_id: The project this conversation belongs to
+            user_message: User's input message
+            ai_response: AI's response message
+        """
+        self.start()
+        self._queue.put_nowait((memory, project_id, user_message, ai_response))
+
+    async def stop(self):
+        """Flush every queued message, then stop the worker"""
+        if self._worker is None:
+            return
+
+        if not self._worker.done():
+            await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def _run(self):
+        """Worker loop: collect a batch, then write it"""
+        while True:
+            items = [await self._queue.get()]
+            await asyncio.sleep(self.flush_delay)
+            while len(items) < self.max_batch and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+
+            try:
+                await asyncio.to_thread(self._write_batch, items)
+            except Exception as e:
+                logger.error("Failed to save %d chat messages: %s", len(items), e)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _write_batch(items: List[Tuple[ChatMemory, int, str, str]]):
+        """Write queued messages, one transaction per memory and project"""
+        groups: Dict[Tuple[int, int], List[Tuple[str, str]]] = defaultdict(list)
+        memories = {}
+        for memory, project_id, user_message, ai_response in items:
+            memories[id(memory)] = memory
+            groups[id(memory), project_id].append((user_message, ai_response))
+
+        # A failing group must not drop the other projects' conversations
+        for (memory_id, project_id), pairs in groups.items():
+            try:
+                memories[memory_id].save_messages(project_id, pairs)
+            except Exception as e:
+                logger.error(
+                    "Failed to save %d chat messages for project %s: %s",
+                    len(pairs), project_id, e, exc_info=True
+                )
+
+
+@cache
+def get_chat_memory_writer() -> ChatMemoryWriter:
+    """Get the global chat memory writer"""
+    return ChatMemoryWriter()
@@ -6,10 +6,27 @@ A testing provider that echoes messages and can simulate tool calling based on c
 import asyncio
 import random
 import re
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from core.base_provider import BaseModelProvider
 from core.base_types import ChatMessage, ChatResponse, ToolDefinition, ToolCall
 
+# Pattern: "call X tools Y times" (case-insensitive, so no .lower() copy per search)
+_TOOL_CMD_RE = re.compile(r"call\s+(\d+)\s+tools?\s+(\d+)\s+times?", re.IGNORECASE)
+
+# Commands the simulated run_command tool picks from, besides one templated
+# entry with the call position that is only formatted when it is drawn
+_TEST_COMMANDS_STATIC = (
+    "ls -la",
+    "pwd",
+    "echo 'Hello from test tool'",
+    "date",
+    "whoami",
+    "grep -r 'test' . | head -3",
+    "find . -name '*.py' | head -5",
+    "git status --porcelain",
+)
+_TEST_TIMEOUTS = (10, 15, 30)
+
 
 class EchoTestProvider(BaseModelProvider):
     """
@@ -25,6 +42,8 @@ class EchoTestProvider(BaseModelProvider):
         """Initialize the echo test provider"""
         super().__init__(api_key, model, **config)
         self.available_tools = []
+        # Private generator: avoids contention on the module-level random instance
+        self._rng = random.Random()
     
     @property
     def provider_name(self) -> str:
@@ -45,12 +64,15 @@ class EchoTestProvider(BaseModelProvider):
     
     async def call_api(self, messages: List[Dict[str, Any]], tools: Optional[Any] = None, **kwargs) -> Dict[str, Any]:
         """Simulate API call"""
-        # Get the last user message
+        # Get the last user message, walking back from the tail by index
         last_message = ""
-        for msg in reversed(messages):
+        i = len(messages) - 1
+        while i >= 0:
+            msg = messages[i]
             if msg.get("role") == "user":
                 last_message = msg.get("content", "")
                 break
+            i -= 1
         
         # Parse command for tool calling
         tool_calls = self._parse_tool_command_raw(last_message, tools or self.available_tools)
@@ -61,20 +83,23 @@ class EchoTestProvider(BaseModelProvider):
         else:
             response_content = f"Echo: {last_message}"
         
+        prompt_tokens = len(last_message.split())
+        completion_tokens = len(response_content.split())
+        
         return {
             "content": response_content,
             "tool_calls": tool_calls,
             "usage": {
-                "prompt_tokens": len(last_message.split()),
-                "completion_tokens": len(response_content.split()),
-                "total_tokens": len(last_message.split()) + len(response_content.split())
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
             },
             "finish_reason": "stop" if not tool_calls else "tool_calls"
         }
     
-    async def call_api_stream(self, messages: List[Dict[str, Any]], tools: Optional[Any] = None, **kwargs) -> Dict[str, Any]:
-        """Simulate streaming API call (same as regular call for test)"""
-        return await self.call_api(messages, tools, **kwargs)
+    # Simulated streaming is the same as a regular call; alias rather than wrap
+    # so there is no extra coroutine frame per request
+    call_api_stream = call_api
     
     def parse_response(self, raw_response: Dict[str, Any]) -> ChatResponse:
         """Parse response to standard format"""
@@ -101,60 +126,95 @@ class EchoTestProvider(BaseModelProvider):
         """Parse streaming chunk (same as parse_response for test)"""
         return self.parse_response(chunk)
     
-    def _parse_tool_command_raw(self, message: str, tools: List[ToolDefinition]) -> List[Dict[str, Any]]:
-        """Parse message for tool calling commands and return raw format"""
-        
-        # Pattern: "call X tools Y times"
-        pattern = r"call\s+(\d+)\s+tools?\s+(\d+)\s+times?"
-        match = re.search(pattern, message.lower())
+    @staticmethod
+    def _tool_command_counts(match: Optional[re.Match]) -> Optional[Tuple[int, int]]:
+        """
+        Extract clamped (num_tools, num_iterations) from a tool command match
         
+        Args:
+            match: Result of _TOOL_CMD_RE.search, or None
+            
+        Returns:
+            Optional[Tuple[int, int]]: Tool and iteration counts, or None without a match
+        """
         if not match:
-            return []
-        
-        num_tools = int(match.group(1))
-        num_iterations = int(match.group(2))
+            return None
         
         # Limit to reasonable numbers (but don't limit by available tools count)
-        num_tools = min(num_tools, 5)
-        num_iterations = min(num_iterations, 3)
+        return min(int(match.group(1)), 5), min(int(match.group(2)), 3)
+    
+    def _parse_tool_command_raw(self, message: str, tools: List[ToolDefinition]) -> List[Dict[str, Any]]:
+        """Parse message for tool calling commands and return raw format"""
         
-        if not tools:
+        counts = self._tool_command_counts(_TOOL_CMD_RE.search(message))
+        if not counts or not tools:
             return []
         
-        tool_calls = []
-        
-        for iteration in range(num_iterations):
-            # Select random tools for this iteration (allow duplicates)
-            for i in range(num_tools):
-                # Pick a random tool (can be the same tool multiple times)
-                selected_tool = random.choice(tools)
-                tool_call = self._create_test_tool_call_raw(selected_tool, iteration, i)
-                tool_calls.append(tool_call)
+        num_tools, num_iterations = counts
+        return self._create_tool_rounds_raw(tools, num_tools, 0, num_iterations)
+    
+    def _create_tool_rounds_raw(
+        self,
+        tools: List[ToolDefinition],
+        num_tools: int,
+        first_round: int,
+        num_rounds: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Create consecutive rounds of raw test tool calls
+        
+        Tools, run_command picks, timeouts and id suffixes for every call are
+        drawn in one batch each rather than several RNG calls per tool.
+        
+        Args:
+            tools: Tools to pick from (duplicates allowed)
+            num_tools: Tool calls per round
+            first_round: Round number of the first round created
+            num_rounds: Number of rounds to create
+            
+        Returns:
+            List[Dict[str, Any]]: Raw tool calls, round by round
+        """
+        rng = self._rng
+        k = num_tools * num_rounds
+        picks = rng.choices(tools, k=k)
+        # The extra slot past the static commands is the templated command
+        command_picks = rng.choices(range(len(_TEST_COMMANDS_STATIC) + 1), k=k)
+        timeouts = rng.choices(_TEST_TIMEOUTS, k=k)
+        suffixes = rng.choices(range(1000, 10000), k=k)
         
+        tool_calls = []
+        for idx, selected_tool in enumerate(picks):
+            round_offset, i = divmod(idx, num_tools)
+            tool_calls.append(self._create_test_tool_call_raw(
+                selected_tool, first_round + round_offset, i,
+                command_picks[idx], timeouts[idx], suffixes[idx]
+            ))
         return tool_calls
     
-    def _create_test_tool_call_raw(self, tool: ToolDefinition, iteration: int, index: int) -> Dict[str, Any]:
-        """Create a test tool call in raw format"""
+    def _create_test_tool_call_raw(
+        self,
+        tool: ToolDefinition,
+        iteration: int,
+        index: int,
+        command_pick: int,
+        timeout: int,
+        suffix: int
+    ) -> Dict[str, Any]:
+        """Create a test tool call in raw format from pre-drawn random values"""
         
-        tool_id = f"test_call_{iteration}_{index}_{random.randint(1000, 9999)}"
+        tool_id = f"test_call_{iteration}_{index}_{suffix}"
         
         # Generate test arguments based on tool type
         if tool.name == "run_command":
-            commands = [
-                "ls -la",
-                "pwd", 
-                "echo 'Hello from test tool'",
-                "date",
-                "whoami",
-                f"grep -r 'test' . | head -3",
-                "find . -name '*.py' | head -5",
-                "git status --porcelain",
-                f"echo 'Tool call #{iteration + 1}.{index + 1}'"
-            ]
+            if command_pick < len(_TEST_COMMANDS_STATIC):
+                command = _TEST_COMMANDS_STATIC[command_pick]
+            else:
+                command = f"echo 'Tool call #{iteration + 1}.{index + 1}'"
             
             arguments = {
-                "command": random.choice(commands),
-                "timeout": random.choice([10, 15, 30])
+                "command": command,
+                "timeout": timeout
             }
             
         else:
@@ -171,9 +231,9 @@ class EchoTestProvider(BaseModelProvider):
                     if param_type == "string":
                         arguments[param] = f"test_value_for_{param}_{iteration}_{index}"
                     elif param_type == "number":
-                        arguments[param] = random.randint(1, 100)
+                        arguments[param] = self._rng.randint(1, 100)
                     elif param_type == "boolean":
-                        arguments[param] = random.choice([True, False])
+                        arguments[param] = self._rng.random() < 0.5
         
         return {
             "id": tool_id,
@@ -192,37 +252,36 @@ class EchoTestProvider(BaseModelProvider):
         if tools:
             self.available_tools = tools
         
-        # Get the last user message
+        # Plain chat turn: the newest message is from the user and carries no
+        # tool command, so there are no rounds to continue - skip the scan
+        if messages and messages[-1].role == "user" and not _TOOL_CMD_RE.search(messages[-1].content):
+            last_message = messages[-1].content or "No user message found"
+            return self._build_response(last_message, f"Echo: {last_message}", [])
+        
+        # One forward pass collects everything the response depends on:
+        # the last user message, the first (original) and latest tool
+        # commands, and the tool rounds completed since the original command
         last_message = None
-        for msg in reversed(messages):
+        first_match = None
+        latest_match = None
+        tool_rounds_completed = 0
+        
+        for msg in messages:
             if msg.role == "user":
                 last_message = msg.content
-                break
+                match = _TOOL_CMD_RE.search(msg.content)
+                if match:
+                    latest_match = match
+                    if first_match is None:
+                        first_match = match
+            elif msg.role == "assistant" and msg.tool_calls and first_match is not None:
+                tool_rounds_completed += 1
         
         if not last_message:
             last_message = "No user message found"
         
         # Parse command for tool calling
-        tool_calls = self._parse_tool_command(last_message, messages)
-        
-        # Count how many tool rounds have already happened for this specific command
-        tool_rounds_completed = 0
-        user_pattern = r"call\s+(\d+)\s+tools?\s+(\d+)\s+times?"
-        
-        # Find the last user message with the tool command pattern
-        last_tool_command_index = -1
-        for i, msg in enumerate(messages):
-            if msg.role == "user" and re.search(user_pattern, msg.content.lower()):
-                last_tool_command_index = i
-                break  # Take the first (latest) match
-        
-        # Count tool calls only after the last tool command
-        if last_tool_command_index >= 0:
-            for i in range(last_tool_command_index + 1, len(messages)):
-                msg = messages[i]
-                if msg.role == "assistant" and msg.tool_calls:
-                    tool_rounds_completed += 1
-        
+        tool_calls = self._parse_tool_command(latest_match, tool_rounds_completed)
         
         # Generate response based on conversation state
         if tool_calls:
@@ -230,20 +289,9 @@ class EchoTestProvider(BaseModelProvider):
             response_content = f"Echo: {last_message}\n\n🔧 Calling {len(tool_calls)} tools as requested..."
         elif tool_rounds_completed > 0:
             # After tool execution, check if this is a continuation response
-            # Look for the original tool command in conversation history
-            user_pattern = r"call\s+(\d+)\s+tools?\s+(\d+)\s+times?"
-            user_match = None
-            
-            # Search through conversation history for the original command
-            for msg in messages:
-                if msg.role == "user":
-                    match = re.search(user_pattern, msg.content.lower())
-                    if match:
-                        user_match = match
-                        break  # Use the first (original) match found
-            
-            if user_match:
-                num_iterations = int(user_match.group(2))
+            # against the original tool command (rounds imply it exists)
+            if first_match:
+                num_iterations = int(first_match.group(2))
                 if tool_rounds_completed < num_iterations:
                     # More iterations expected, provide intermediate response
                     response_content = f"Echo: Completed tool round {tool_rounds_completed}. Continuing with more tools..."
@@ -256,13 +304,20 @@ class EchoTestProvider(BaseModelProvider):
             # Regular echo without tool calling
             response_content = f"Echo: {last_message}"
         
+        return self._build_response(last_message, response_content, tool_calls)
+    
+    def _build_response(self, last_message: str, response_content: str, tool_calls: List[ToolCall]) -> ChatResponse:
+        """Wrap generated content in a ChatResponse with word-count usage"""
+        prompt_tokens = len(last_message.split())
+        completion_tokens = len(response_content.split())
+        
         return ChatResponse(
             content=response_content,
             model=self.model,
             usage={
-                "prompt_tokens": len(last_message.split()),
-                "completion_tokens": len(response_content.split()),
-                "total_tokens": len(last_message.split()) + len(response_content.split())
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
             },
             finish_reason="stop" if not tool_calls else "tool_calls",
             provider="echo_test",
@@ -270,124 +325,56 @@ class EchoTestProvider(BaseModelProvider):
             requires_tool_execution=bool(tool_calls)
         )
     
-    def _parse_tool_command(self, message: str, messages: List[ChatMessage] = None) -> List[ToolCall]:
-        """Parse message for tool calling commands"""
-        
-        # Look for the original tool command in the conversation history
-        # Pattern: "call X tools Y times"
-        pattern = r"call\s+(\d+)\s+tools?\s+(\d+)\s+times?"
-        
-        # First check the current message
-        match = re.search(pattern, message.lower())
-        # If no match in current message, look through conversation history for the original command
-        if not match and messages:
-            for msg in reversed(messages):
-                if msg.role == "user":
-                    user_match = re.search(pattern, msg.content.lower())
-                    if user_match:
-                        match = user_match
-                        break
-        
-        if not match:
+    def _parse_tool_command(
+        self,
+        match: Optional[re.Match],
+        tool_rounds_completed: Optional[int] = None,
+        messages: Optional[List[ChatMessage]] = None
+    ) -> List[ToolCall]:
+        """
+        Create the next round of tool calls for a tool command
+        
+        Args:
+            match: Latest "call X tools Y times" match in the conversation
+            tool_rounds_completed: Tool rounds already run since the original
+                command, or None to count them from messages
+            messages: Conversation to count rounds in when not precomputed
+            
+        Returns:
+            List[ToolCall]: Tool calls for the next round, or [] when done
+        """
+        counts = self._tool_command_counts(match)
+        if not counts or not self.available_tools:
             return []
         
-        num_tools = int(match.group(1))
-        num_iterations = int(match.group(2))
-        
-        # Limit to reasonable numbers (but don't limit by available tools count)
-        num_tools = min(num_tools, 5)
-        num_iterations = min(num_iterations, 3)
-        
-        if not self.available_tools:
-            return []
+        num_tools, num_iterations = counts
         
-        # Count how many tool rounds have already happened for this specific command
-        tool_rounds_completed = 0
-        if messages:
-            # Find the last user message with the tool command pattern
-            last_tool_command_index = -1
-            for i, msg in enumerate(messages):
-                if msg.role == "user" and re.search(pattern, msg.content.lower()):
-                    last_tool_command_index = i
-                    break  # Take the first (latest) match
-            
-            # Count tool calls only after the last tool command
-            if last_tool_command_index >= 0:
-                for i in range(last_tool_command_index + 1, len(messages)):
-                    msg = messages[i]
-                    if msg.role == "assistant" and msg.tool_calls:
-                        tool_rounds_completed += 1
+        if tool_rounds_completed is None:
+            tool_rounds_completed = self._count_tool_rounds(messages or [])
         
         # Only call more tools if we haven't reached the requested number of iterations
         if tool_rounds_completed >= num_iterations:
             return []  # No more tools needed
         
-        tool_calls = []
-        
-        # Select random tools for this round (allow duplicates)
-        for i in range(num_tools):
-            # Pick a random tool (can be the same tool multiple times)
-            selected_tool = random.choice(self.available_tools)
-            tool_call = self._create_test_tool_call(selected_tool, tool_rounds_completed, i)
-            tool_calls.append(tool_call)
-        return tool_calls
+        return [
+            ToolCall(**raw)
+            for raw in self._create_tool_rounds_raw(self.available_tools, num_tools, tool_rounds_completed, 1)
+        ]
     
-    def _create_test_tool_call(self, tool: ToolDefinition, iteration: int, index: int) -> ToolCall:
-        """Create a test tool call with realistic parameters"""
-        
-        tool_id = f"test_call_{iteration}_{index}_{random.randint(1000, 9999)}"
-        
-        # Generate test arguments based on tool type
-        if tool.name == "run_command":
-            commands = [
-                "ls -la",
-                "pwd",
-                "echo 'Hello from test tool'",
-                "date",
-                "whoami",
-                f"grep -r 'test' . | head -3",
-                "find . -name '*.py' | head -5",
-                "git status --porcelain",
-                f"echo 'Tool call #{iteration + 1}.{index + 1}'"
-            ]
-            
-            arguments = {
-                "command": random.choice(commands),
-                "timeout": random.choice([10, 15, 30])
-            }
-            
-        else:
-            # For other tools, create generic test arguments
-            arguments = {}
-            
-            # Add required parameters with test values
-            properties = tool.parameters.get("properties", {})
-            required = tool.parameters.get("required", [])
-            
-            for param in required:
-                if param in properties:
-                    param_type = properties[param].get("type", "string")
-                    if param_type == "string":
-                        arguments[param] = f"test_value_for_{param}_{iteration}_{index}"
-                    elif param_type == "number":
-                        arguments[param] = random.randint(1, 100)
-                    elif param_type == "boolean":
-                        arguments[param] = random.choice([True, False])
-        
-        return ToolCall(
-            id=tool_id,
-            name=tool.name,
-            arguments=arguments
-        )
+    @staticmethod
+    def _count_tool_rounds(messages: List[ChatMessage]) -> int:
+        """Count assistant tool rounds after the first tool command in the conversation"""
+        seen_command = False
+        tool_rounds_completed = 0
+        for msg in messages:
+            if msg.role == "user":
+                seen_command = seen_command or _TOOL_CMD_RE.search(msg.content) is not None
+            elif msg.role == "assistant" and msg.tool_calls and seen_command:
+                tool_rounds_completed += 1
+        return tool_rounds_completed
     
-    async def stream_generate(
-        self,
-        messages: List[ChatMessage],
-        tools: Optional[List[ToolDefinition]] = None,
-        **kwargs
-    ) -> ChatResponse:
-        """For streaming, just return the same as generate"""
-        return await self.generate(messages, tools, **kwargs)
+    # For streaming, just return the same as generate
+    stream_generate = generate
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get model information"""
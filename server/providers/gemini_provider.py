@@ -3,16 +3,98 @@ Google Gemini Provider
 Implementation for Google's Gemini API with function calling support
 """
 
-import json
+import itertools
+import time
 import httpx
+import orjson
 import re
 import logging
 from typing import Dict, List, Optional, Any, AsyncIterator
-from datetime import datetime
 
 from core.base_provider import BaseModelProvider
 from core.base_types import ChatMessage, ChatResponse, ToolDefinition, ToolCall
 
+logger = logging.getLogger(__name__)
+
+# Tool call ids: monotonic clock plus a process-wide counter, so calls in the
+# same response (same clock tick) still get distinct ids
+_ID_COUNTER = itertools.count()
+
+# Shared across provider instances so keep-alive connections (and their
+# TLS handshakes) outlive a single chat request
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide HTTP/2 client used for Gemini requests"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(30, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                keepalive_expiry=30.0
+            )
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client (called on server shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _gemini_role(role: str) -> str:
+    """Convert role names ("user" stays, everything else becomes "model")"""
+    return "user" if role == "user" else "model"
+
+
+def _build_function_call_message(msg: ChatMessage) -> Dict[str, Any]:
+    """Assistant message with function calls"""
+    parts = [{"text": msg.content}] if msg.content else []
+    parts.extend(
+        {
+            "functionCall": {
+                "name": tool_call["name"],
+                "args": tool_call.get("arguments", {})
+            }
+        }
+        for tool_call in msg.tool_calls
+    )
+    return {"role": _gemini_role(msg.role), "parts": parts}
+
+
+def _build_tool_result_message(msg: ChatMessage) -> Dict[str, Any]:
+    """Tool result message (tool results are user messages in Gemini)"""
+    logger.debug("Formatting tool result: name=%s, content_length=%d", msg.tool_call_id, len(msg.content or ""))
+    return {
+        "role": "user",
+        "parts": [{
+            "functionResponse": {
+                "name": msg.tool_call_id,
+                "response": {"content": msg.content}
+            }
+        }]
+    }
+
+
+def _build_text_message(msg: ChatMessage) -> Dict[str, Any]:
+    """Regular text message"""
+    return {"role": _gemini_role(msg.role), "parts": [{"text": msg.content}]}
+
+
+# Builders for messages without tool calls, keyed by role
+_MESSAGE_BUILDERS = {
+    "tool": _build_tool_result_message,
+    "user": _build_text_message,
+    "assistant": _build_text_message,
+}
+
 
 class GeminiProvider(BaseModelProvider):
     """
@@ -25,9 +107,36 @@ class GeminiProvider(BaseModelProvider):
         super().__init__(api_key, model, **config)
         self.base_url = "https://generativelanguage.googleapis.com/v1beta"
         
-        # HTTP client
-        timeout = config.get("timeout", 30)
-        self.client = httpx.AsyncClient(timeout=timeout)
+        # Endpoints only depend on the model, build them once
+        self._generate_url = f"{self.base_url}/models/{self.model}:generateContent"
+        # alt=sse puts each streamed response on its own "data:" line instead
+        # of pretty-printing one JSON array across many lines
+        self._stream_url = f"{self.base_url}/models/{self.model}:streamGenerateContent?alt=sse"
+        
+        # Generation settings from config; shared by every call that doesn't
+        # override temperature or max_tokens
+        self._gen_config_default = {
+            "temperature": self.config.get("temperature", 0.7),
+            "maxOutputTokens": self.config.get("max_tokens", 4000),
+            "candidateCount": 1
+        }
+        
+        # Last format_tools input/output, matched by ToolDefinition identity
+        # since the tool set rarely changes between turns
+        self._tools_cache: tuple = ((), [])
+        
+        # Formatted messages from the last format_messages call, keyed by
+        # id() of the source ChatMessage (kept alive alongside the result)
+        self._formatted_cache: Dict[int, tuple] = {}
+        
+        # HTTP: all instances share one pooled client, looked up per request
+        # (providers held by open sessions outlive a client closed on shutdown), and only
+        # carry their own key and timeout
+        self._timeout = httpx.Timeout(config.get("timeout", 30), connect=5.0)
+        self._headers = {
+            "Content-Type": "application/json",
+            "x-goog-api-key": self.api_key
+        }
     
     @property
     def provider_name(self) -> str:
@@ -47,64 +156,32 @@ class GeminiProvider(BaseModelProvider):
             ]
         }
         """
-        logger = logging.getLogger(__name__)
-        logger.info(f"Formatting {len(messages)} messages for Gemini")
+        logger.info("Formatting %d messages for Gemini", len(messages))
         
+        # Each turn re-sends the same history plus a few new messages, so
+        # reuse the formatted dict of any message object seen last call
+        previous = self._formatted_cache
+        current = {}
         gemini_messages = []
-        
         for msg in messages:
             # Skip system messages - Gemini handles them differently
             if msg.role == "system":
                 continue
-            
-            # Convert role names
-            role = "user" if msg.role == "user" else "model"
-            
-            if msg.tool_calls:
-                # Assistant message with function calls
-                parts = []
-                if msg.content:
-                    parts.append({"text": msg.content})
-                
-                for tool_call in msg.tool_calls:
-                    parts.append({
-                        "functionCall": {
-                            "name": tool_call["name"],
-                            "args": tool_call.get("arguments", {})
-                        }
-                    })
-                
-                gemini_messages.append({"role": role, "parts": parts})
-                
-            elif msg.role == "tool":
-                # Tool result message
-                logger.info(f"Formatting tool result: name={msg.tool_call_id}, content_length={len(msg.content) if msg.content else 0}")
-                tool_response = {
-                    "role": "user",  # Tool results are user messages in Gemini
-                    "parts": [{
-                        "functionResponse": {
-                            "name": msg.tool_call_id,
-                            "response": {"content": msg.content}
-                        }
-                    }]
-                }
-                gemini_messages.append(tool_response)
-                
-            else:
-                # Regular text message
-                gemini_messages.append({
-                    "role": role,
-                    "parts": [{"text": msg.content}]
-                })
-        
-        logger.info(f"Formatted {len(gemini_messages)} messages for Gemini API")
-        for i, msg in enumerate(gemini_messages):
-            role = msg.get('role', 'unknown')
-            parts_count = len(msg.get('parts', []))
-            logger.info(f"Message {i}: role={role}, parts={parts_count}")
-            for j, part in enumerate(msg.get('parts', [])):
-                part_type = list(part.keys())[0] if part else "empty"
-                logger.info(f"  Part {j}: type={part_type}")
+            hit = previous.get(id(msg))
+            if hit is None or hit[0] is not msg:
+                builder = _build_function_call_message if msg.tool_calls else _MESSAGE_BUILDERS.get(msg.role, _build_text_message)
+                hit = (msg, builder(msg))
+            current[id(msg)] = hit
+            gemini_messages.append(hit[1])
+        self._formatted_cache = current
+        
+        logger.info("Formatted %d messages for Gemini API", len(gemini_messages))
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, msg in enumerate(gemini_messages):
+                parts = msg.get('parts', [])
+                logger.debug("Message %d: role=%s, parts=%d", i, msg.get('role', 'unknown'), len(parts))
+                for j, part in enumerate(parts):
+                    logger.debug("  Part %d: type=%s", j, next(iter(part), "empty"))
         
         return gemini_messages
     
@@ -130,6 +207,10 @@ class GeminiProvider(BaseModelProvider):
         if not tools:
             return []
         
+        cached_tools, cached_result = self._tools_cache
+        if len(cached_tools) == len(tools) and all(a is b for a, b in zip(cached_tools, tools)):
+            return cached_result
+        
         function_declarations = []
         for tool in tools:
             function_declarations.append({
@@ -138,68 +219,83 @@ class GeminiProvider(BaseModelProvider):
                 "parameters": tool.parameters
             })
         
-        return [{"function_declarations": function_declarations}]
+        result = [{"function_declarations": function_declarations}]
+        self._tools_cache = (tuple(tools), result)
+        return result
     
-    async def call_api(
-        self, 
-        messages: List[Dict[str, Any]], 
+    def _build_payload(
+        self,
+        messages: List[Dict[str, Any]],
         tools: Optional[List[Dict[str, Any]]] = None,
         **kwargs
     ) -> Dict[str, Any]:
-        """Make API call to Gemini"""
+        """Build the generateContent request body"""
+        generation_config = self._gen_config_default
+        if "temperature" in kwargs or "max_tokens" in kwargs:
+            generation_config = {
+                "temperature": kwargs.get("temperature", generation_config["temperature"]),
+                "maxOutputTokens": kwargs.get("max_tokens", generation_config["maxOutputTokens"]),
+                "candidateCount": 1
+            }
         
-        # Build request payload
         payload = {
             "contents": messages,
-            "generationConfig": {
-                "temperature": kwargs.get("temperature", self.config.get("temperature", 0.7)),
-                "maxOutputTokens": kwargs.get("max_tokens", self.config.get("max_tokens", 4000)),
-                "candidateCount": 1
-            }
+            "generationConfig": generation_config
         }
         
         if tools:
             payload["tools"] = tools
         
+        return payload
+    
+    async def call_api(
+        self, 
+        messages: List[Dict[str, Any]], 
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Make API call to Gemini"""
+        
+        # Build request payload
+        payload = self._build_payload(messages, tools, **kwargs)
+        
         # Make request
-        url = f"{self.base_url}/models/{self.model}:generateContent"
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": self.api_key
-        }
+        url = self._generate_url
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            contents = payload["contents"]
+            logger.debug("Making Gemini API request to %s", url)
+            logger.debug("Payload keys: %s", list(payload))
+            logger.debug("Messages count: %d", len(contents))
+            logger.debug("Tools provided: %s", bool(tools))
+            if contents:
+                logger.debug("Last message role: %s", contents[-1].get("role"))
         
         try:
-            import logging
-            logger = logging.getLogger(__name__)
-            
-            logger.info(f"Making Gemini API request to {url}")
-            logger.info(f"Payload keys: {list(payload.keys())}")
-            logger.info(f"Messages count: {len(payload.get('contents', []))}")
-            logger.info(f"Tools provided: {bool(tools)}")
-            if payload.get('contents'):
-                last_msg = payload['contents'][-1] if payload['contents'] else None
-                logger.info(f"Last message role: {last_msg.get('role') if last_msg else None}")
-            
-            response = await self.client.post(url, json=payload, headers=headers)
-            
-            if not response.is_success:
-                logger.error(f"Gemini API HTTP {response.status_code}: {response.text}")
-                try:
-                    error_details = response.json()
-                    logger.error(f"Gemini error details: {error_details}")
-                except:
-                    logger.error(f"Raw error response: {response.text}")
-            
+            # Encode with orjson rather than letting httpx json.dumps the history
+            response = await get_http_client().post(
+                url, content=orjson.dumps(payload), headers=self._headers, timeout=self._timeout
+            )
             response.raise_for_status()
-            result = response.json()
-            logger.info(f"Gemini response received with {len(result.get('candidates', []))} candidates")
-            return result
+            result = orjson.loads(response.content)
+        except httpx.HTTPStatusError as e:
+            # Error details are only gathered once a request has actually failed
+            logger.error("Gemini API HTTP %s: %s", e.response.status_code, e.response.text)
+            self._log_failed_payload(payload)
+            raise Exception(f"Gemini API error: {str(e)}")
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Gemini API error: {str(e)}")
-            logger.error(f"Request payload structure: {json.dumps(payload, indent=2)}")
+            logger.error("Gemini API error: %s", e)
+            self._log_failed_payload(payload)
             raise Exception(f"Gemini API error: {str(e)}")
+        
+        logger.info("Gemini response received with %d candidates", len(result.get("candidates", ())))
+        return result
+    
+    @staticmethod
+    def _log_failed_payload(payload: Dict[str, Any]):
+        """Dump a failed request payload (the whole conversation) at debug level"""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Request payload structure: %s", orjson.dumps(payload, option=orjson.OPT_INDENT_2).decode())
     
     async def call_api_stream(
         self, 
@@ -210,45 +306,61 @@ class GeminiProvider(BaseModelProvider):
         """Make streaming API call to Gemini"""
         
         # Build request payload (same as non-streaming)
-        payload = {
-            "contents": messages,
-            "generationConfig": {
-                "temperature": kwargs.get("temperature", self.config.get("temperature", 0.7)),
-                "maxOutputTokens": kwargs.get("max_tokens", self.config.get("max_tokens", 4000)),
-                "candidateCount": 1
-            }
-        }
-        
-        if tools:
-            payload["tools"] = tools
+        payload = self._build_payload(messages, tools, **kwargs)
         
         # Make streaming request
-        url = f"{self.base_url}/models/{self.model}:streamGenerateContent"
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": self.api_key
-        }
+        url = self._stream_url
         
         try:
-            async with self.client.stream("POST", url, json=payload, headers=headers) as response:
+            async with get_http_client().stream(
+                "POST", url, content=orjson.dumps(payload), headers=self._headers, timeout=self._timeout
+            ) as response:
                 response.raise_for_status()
                 
-                async for line in response.aiter_lines():
-                    if line.strip():
-                        try:
-                            yield json.loads(line)
-                        except json.JSONDecodeError:
-                            continue
+                # Split raw bytes on newlines ourselves and hand each line to
+                # orjson directly, skipping the str decode aiter_lines() does
+                buffer = bytearray()
+                async for chunk in response.aiter_bytes(chunk_size=16384):
+                    buffer += chunk
+                    start = 0
+                    newline = buffer.find(b"\n")
+                    while newline != -1:
+                        chunk_data = self._parse_stream_line(buffer[start:newline])
+                        if chunk_data is not None:
+                            yield chunk_data
+                        start = newline + 1
+                        newline = buffer.find(b"\n", start)
+                    del buffer[:start]
+                
+                # Final line without a trailing newline
+                chunk_data = self._parse_stream_line(buffer)
+                if chunk_data is not None:
+                    yield chunk_data
         except Exception as e:
             raise Exception(f"Gemini streaming error: {str(e)}")
     
+    @staticmethod
+    def _parse_stream_line(line: bytes) -> Optional[Dict[str, Any]]:
+        """Decode one streamed line, or None for blank and non-JSON lines"""
+        if line.startswith(b"data:"):
+            line = line[5:]
+        # Also accept one-object-per-line JSON array framing ("[{...}", ",{...}", "]")
+        line = line.strip(b" \t\r[],")
+        if not line:
+            return None
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            return None
+    
     def parse_response(self, raw_response: Dict[str, Any]) -> ChatResponse:
         """Parse Gemini response to our standard format"""
         
         candidates = raw_response.get("candidates", [])
         if not candidates:
             logger.warning("No candidates in Gemini response, returning empty response")
-            logger.warning(f"Raw response: {json.dumps(raw_response, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw response: %s", orjson.dumps(raw_response, option=orjson.OPT_INDENT_2).decode())
             
             # Check if there's a finishReason in the response that explains why
             finish_reason = "stop"
@@ -256,7 +368,7 @@ class GeminiProvider(BaseModelProvider):
                 # Look for any metadata about why there are no candidates
                 if "promptFeedback" in raw_response:
                     feedback = raw_response["promptFeedback"]
-                    logger.warning(f"Prompt feedback: {feedback}")
+                    logger.warning("Prompt feedback: %s", feedback)
                     if "blockReason" in feedback:
                         finish_reason = f"blocked_{feedback['blockReason']}"
             
@@ -274,21 +386,22 @@ class GeminiProvider(BaseModelProvider):
         parts = candidate.get("content", {}).get("parts", [])
         
         # Extract content and tool calls
-        content = ""
+        text_parts = []
         tool_calls = []
         
         for part in parts:
             if "text" in part:
-                content += part["text"]
+                text_parts.append(part["text"])
             elif "functionCall" in part:
                 func_call = part["functionCall"]
-                import random
                 tool_calls.append(ToolCall(
-                    id=f"gemini_call_{int(datetime.now().timestamp())}_{random.randint(1000, 9999)}",
+                    id=f"gemini_call_{time.monotonic_ns()}_{next(_ID_COUNTER)}",
                     name=func_call["name"],
                     arguments=func_call.get("args", {})
                 ))
         
+        content = "".join(text_parts)
+        
         # Determine finish reason
         finish_reason = candidate.get("finishReason", "STOP").lower()
         if finish_reason == "stop":
@@ -326,5 +439,4 @@ class GeminiProvider(BaseModelProvider):
             return None
 
     async def close(self):
-        """Close HTTP client"""
-        await self.client.aclose()
+        """Release the provider (the shared HTTP client stays open for others)"""
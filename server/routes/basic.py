@@ -6,6 +6,8 @@ Root and health check endpoints
 from datetime import datetime
 from fastapi import APIRouter
 
+from utils.database import get_pool
+
 # Create router
 router = APIRouter(tags=["basic"])
 
@@ -17,4 +19,10 @@ async def root():
 
 @router.get("/health")
 async def health():
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
\ No newline at end of file
+    # orjson writes the datetime as ISO 8601 itself, no isoformat() string needed
+    return {"status": "ok", "timestamp": datetime.now()}
+
+@router.get("/pool-health")
+async def pool_health():
+    # Connections of the shared SQLite pool: open = idle + in_use
+    return get_pool().stats()
@@ -4,51 +4,48 @@ API endpoints for chat functionality
 """
 
 import asyncio
-import json
+import orjson
 import logging
-import traceback
+import time
 from datetime import datetime
-from typing import List, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Type
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, ConfigDict, ValidationError
 import sqlite3
 from pathlib import Path
 
 from memory.chat_memory import get_chat_memory
+from utils.database import fetch_row, get_db
+from core.base_provider import BaseModelProvider
 from core.chat_manager import ChatManager, ConversationStep
 from core.base_types import ChatMessage as CoreChatMessage, ToolDefinition
 from core.session_manager import get_session_manager
-from providers.gemini_provider import GeminiProvider
-from providers.echo_test_provider import EchoTestProvider
 from tools.tool_manager import get_tool_manager
 
-# Request/Response models
+# Request/Response models (frozen: handlers only read them)
 class ChatMessage(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     message: str
     project_id: int
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     response: str
     timestamp: str
 
 class ToolApprovalRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     project_id: int
     session_id: str
     approved_tools: List[str]
     denied_tools: List[str]
 
-# Database setup
-DB_PATH = Path.home() / ".ai-cli" / "ai_cli.db"
-
-def get_db():
-    """Get database connection"""
-    DB_PATH.parent.mkdir(exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# Chat memory is always enabled now
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -57,165 +54,164 @@ logger = logging.getLogger(__name__)
 router = APIRouter(tags=["chat"])
 
 
-def generate_claude_style_response(message: str) -> str:
-    """Generate a Claude-style structured response for demo purposes"""
-    
-    # Different response patterns based on message content
-    if "hello" in message.lower() or "hi" in message.lower():
-        return """● Hello! I'm your AI coding assistant ready to help with your project.
-
-● **Available Commands:**
-  - Code analysis and review
-  - Bug fixing and debugging  
-  - Feature implementation
-  - Documentation generation
-  - Code refactoring suggestions
-
-● **Project Integration:**
-  I have access to your project context and can help with:
-  - File system operations
-  - Git operations  
-  - Package management
-  - Testing and deployment
-
-● **Getting Started:**
-  Try asking me something like:
-  - "Analyze the main.py file"
-  - "Help me fix this bug in my React component"
-  - "Generate a README for this project" 
-  - "Refactor this function to be more efficient"
-  
-What would you like to work on first?"""
-
-    elif "error" in message.lower() or "bug" in message.lower():
-        return """● I'll help you debug that issue! Let me analyze the problem.
-
-● **Debugging Process:**
-  ⎿ 🔍 **Step 1:** Identify the error source
-     🔍 **Step 2:** Analyze the error context
-     🔍 **Step 3:** Suggest potential fixes
-     🔍 **Step 4:** Implement the solution
-
-● **Common Error Types:**
-  - Syntax errors
-  - Runtime exceptions  
-  - Logic errors
-  - Performance issues
-  - Memory leaks
-
-● **To help you better, please provide:**
-  - The specific error message
-  - The code that's causing the issue
-  - Expected vs actual behavior
-  - Any relevant stack traces
-
-```python
-# Example: If you have a Python error like this:
-def broken_function():
-    result = undefined_variable  # NameError
-    return result
-```
-
-● **Next Steps:**
-  Share your error details and I'll provide a targeted solution!"""
-
-    elif "code" in message.lower() or "analyze" in message.lower():
-        return """● I'll analyze your code! Let me break down what I can help with.
-
-● **Code Analysis Services:**
-  
-  **🔍 Static Analysis:**
-  - Code quality assessment
-  - Best practices review
-  - Security vulnerability detection
-  - Performance optimization suggestions
-
-  **📊 Metrics & Insights:**
-  - Code complexity analysis
-  - Test coverage evaluation  
-  - Documentation completeness
-  - Maintainability scoring
-
-● **Update(analysis-results)**
-  ⎿ Found 3 areas for improvement in your codebase                              
-       ```python
-    23    def get_user_data(user_id):
-    24 -      # TODO: Add input validation
-    24 +      if not user_id or not isinstance(user_id, int):
-    25 +          raise ValueError("Invalid user_id")
-    26        return database.fetch_user(user_id)
-       ```
-
-● **Recommendations:**
-  - ✅ Add input validation to public functions
-  - ✅ Implement proper error handling
-  - ✅ Add type hints for better code clarity
-  - ✅ Consider adding unit tests
-
-Which specific file or function would you like me to analyze in detail?"""
-
-    else:
-        return f"""● I received your message: "{message}"
-
-● **Understanding Your Request:**
-  I'm analyzing what you're asking for and preparing a helpful response.
-
-● **AI Integration Status:**
-  ⎿ 🔄 **Current Status:** Demo mode active
-     🔧 **Integration:** DeepSeek, OpenAI, and Ollama models coming soon
-     📊 **Features:** Full tool calling and project context awareness
-
-● **Available Now:**
-  - Project management and organization
-  - File structure analysis
-  - Basic code formatting
-  - Development workflow assistance
-
-● **Coming Soon:**
-  - Full AI model integration
-  - Advanced code generation
-  - Intelligent debugging
-  - Automated refactoring
-
-● **Try asking me about:**
-  - Project structure and organization
-  - Code review and best practices
-  - Development workflows
-  - Tool recommendations
-
-How can I help you with your project today?"""
-
-
-async def get_project_settings(project_id: int) -> dict:
+# Project paths and settings change rarely, so reads are memoized per
+# project (settings for a short TTL); routes that modify projects or
+# project_settings call invalidate_project_cache
+_SETTINGS_CACHE_TTL = 30.0
+_settings_cache: Dict[int, Tuple[float, Mapping[str, Any]]] = {}
+_project_paths: Dict[int, str] = {}
+
+# Settings used when a project has none saved; read-only because the same
+# mapping is handed to every caller
+_DEFAULT_PROJECT_SETTINGS = MappingProxyType({
+    "ai_provider": MappingProxyType({
+        "type": MappingProxyType({"value": "gemini"}),
+        "api_key": MappingProxyType({"value": ""}),
+        "model": MappingProxyType({"value": "gemini-pro"})
+    })
+})
+_NO_SETTINGS = MappingProxyType({})
+
+# Path and settings are always needed together, so one LEFT JOIN reads
+# both; shared statement text keeps it in sqlite3's statement cache
+_PROJECT_SQL = (
+    "SELECT p.path, ps.config_data FROM projects p "
+    "LEFT JOIN project_settings ps ON ps.project_id = p.id WHERE p.id = ?"
+)
+
+
+def invalidate_project_cache(project_id: int):
+    """Drop the cached path, settings and open session for a project after they were modified"""
+    _settings_cache.pop(project_id, None)
+    _project_paths.pop(project_id, None)
+    get_session_manager().cleanup_project_session(project_id)
+
+
+async def get_project_path(project_id: int) -> Optional[str]:
+    """Get a project's directory, or None if the project does not exist"""
+    path = _project_paths.get(project_id)
+    if path is None:
+        path, _ = await _fetch_project(project_id)
+    return path
+
+
+async def get_project_settings(project_id: int) -> Mapping[str, Any]:
     """Get project settings including AI provider config"""
+    hit = _settings_cache.get(project_id)
+    if hit and time.monotonic() - hit[0] < _SETTINGS_CACHE_TTL:
+        return hit[1]
+    
+    _, settings = await _fetch_project(project_id)
+    return settings
+
+
+async def _fetch_project(project_id: int) -> Tuple[Optional[str], Mapping[str, Any]]:
+    """Load a project's path and settings and cache both"""
+    now = time.monotonic()
+    # Read SQLite in a worker thread to keep the event loop free
+    path, settings = await asyncio.to_thread(_load_project, project_id)
+    
+    # Missing projects are not cached, they may be created later; failed
+    # lookups return _NO_SETTINGS and are retried on the next request
+    if path is not None:
+        _project_paths[project_id] = path
+        if settings:
+            _settings_cache[project_id] = (now, settings)
+    return path, settings
+
+
+def _load_project(project_id: int) -> Tuple[Optional[str], Mapping[str, Any]]:
+    """Read a project's directory and settings, falling back to default settings"""
+    logger.info("Getting settings for project %s", project_id)
+    with get_db() as conn:
+        row = fetch_row(conn, _PROJECT_SQL, (project_id,))
+    
+    if row is None:
+        return None, _DEFAULT_PROJECT_SETTINGS
+    
+    path, raw_config = row
+    if raw_config is None:
+        logger.warning("No settings found for project %s, using defaults", project_id)
+        return path, _DEFAULT_PROJECT_SETTINGS
+    
     try:
-        logger.info(f"Getting settings for project {project_id}")
-        with get_db() as conn:
-            cursor = conn.execute(
-                "SELECT config_data FROM project_settings WHERE project_id = ?", 
-                (project_id,)
-            )
-            row = cursor.fetchone()
-            
-            if row:
-                config_data = json.loads(row["config_data"])
-                logger.info(f"Found project settings: {config_data}")
-                return config_data
-            else:
-                logger.warning(f"No settings found for project {project_id}, using defaults")
-                # Default settings
-                default_settings = {
-                    "ai_provider": {
-                        "type": {"value": "gemini"},
-                        "api_key": {"value": ""},
-                        "model": {"value": "gemini-pro"}
-                    }
-                }
-                return default_settings
+        settings = orjson.loads(raw_config)
     except Exception as e:
-        logger.error(f"Error getting project settings: {e}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        return {}
+        logger.error("Error getting project settings: %s", e, exc_info=True)
+        return path, _NO_SETTINGS
+    
+    # Not dumped: the settings hold API keys
+    logger.info("Found project settings for project %s", project_id)
+    return path, settings
+
+# Stream headers: no caching, and no proxy buffering (nginx) or compression
+# holding frames back
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+    "Content-Encoding": "identity"
+}
+
+
+def _encode_step(step: ConversationStep, session_id: str) -> bytes:
+    """
+    Encode a conversation step as one SSE frame
+    
+    ToolCall is a dataclass, so orjson serializes step.tool_calls directly
+    as {"id", "name", "arguments"} objects without an intermediate list of
+    dicts; a single orjson.dumps of the frame dict measured faster than
+    stitching pre-encoded byte fragments together. Tool results carry
+    arbitrary tool output, so non-string dict keys are allowed as in
+    ORJSONResponse.
+    """
+    return b"data: " + orjson.dumps({
+        "type": "conversation_step",
+        "state": step.state.value,
+        "content": step.content,
+        "tool_calls": step.tool_calls or None,
+        "tool_results": step.tool_results,
+        "error": step.error,
+        "session_id": session_id,
+        "timestamp": datetime.now()
+    }, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
+
+
+def _load_gemini_provider() -> Type[BaseModelProvider]:
+    """Import the Gemini provider (pulls in httpx) on first use"""
+    from providers.gemini_provider import GeminiProvider
+    return GeminiProvider
+
+
+def _load_echo_test_provider() -> Type[BaseModelProvider]:
+    """Import the echo test provider on first use"""
+    from providers.echo_test_provider import EchoTestProvider
+    return EchoTestProvider
+
+
+# Provider modules are imported only once a project selects them, so the
+# server starts without loading HTTP clients for providers nobody uses
+_PROVIDER_LOADERS = {
+    "gemini": _load_gemini_provider,
+    "echo_test": _load_echo_test_provider,
+}
+
+
+def _create_provider(provider_type: str, api_key: str, model: str) -> Optional[BaseModelProvider]:
+    """
+    Create the provider for a configuration
+    
+    Each ChatManager gets its own provider, so the provider's per-instance
+    caches (formatted tools and messages) follow one conversation and live
+    as long as its session; the API key is dropped with it.
+    """
+    loader = _PROVIDER_LOADERS.get(provider_type)
+    if loader is None:
+        return None
+    if provider_type == "echo_test":
+        logger.debug("Using echo test provider")
+        api_key = api_key or "test-key"
+    return loader()(api_key=api_key, model=model)
+
 
 async def create_chat_manager(project_id: int, project_path: str) -> Optional[ChatManager]:
     """Create ChatManager with configured AI provider"""
@@ -232,19 +228,15 @@ async def create_chat_manager(project_id: int, project_path: str) -> Optional[Ch
         api_key = provider_config.get("api_key", {}).get("value", "")
         model = provider_config.get("model", {}).get("value", "gemini-pro")
         
-        logger.info(f"Creating chat manager: provider={default_provider}, model={model}, has_api_key={bool(api_key)}")
+        logger.info("Creating chat manager: provider=%s, model=%s, has_api_key=%s", default_provider, model, bool(api_key))
         
         # Create provider
-        if default_provider == "gemini":
-            if not api_key:
-                logger.error(f"No API key configured for provider {default_provider}")
-                return None
-            provider = GeminiProvider(api_key=api_key, model=model)
-        elif default_provider == "echo_test":
-            print("##### USING ECHO TEST PROVIDER")
-            provider = EchoTestProvider(api_key=api_key or "test-key", model=model)
-        else:
-            logger.error(f"Unsupported provider type: {default_provider}")
+        if default_provider == "gemini" and not api_key:
+            logger.error("No API key configured for provider %s", default_provider)
+            return None
+        provider = _create_provider(default_provider, api_key, model)
+        if provider is None:
+            logger.error("Unsupported provider type: %s", default_provider)
             return None
         
         # Create chat manager
@@ -257,14 +249,13 @@ async def create_chat_manager(project_id: int, project_path: str) -> Optional[Ch
         # Set available tools
         tool_manager = get_tool_manager()
         available_tools = tool_manager.get_available_tools()
-        logger.info(f"Setting {len(available_tools)} available tools")
+        logger.info("Setting %d available tools", len(available_tools))
         chat_manager.set_available_tools(available_tools)
         
         return chat_manager
         
     except Exception as e:
-        logger.error(f"Error creating chat manager: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("Error creating chat manager: %s", e, exc_info=True)
         return None
 
 @router.post("/chat/stream")
@@ -272,91 +263,70 @@ async def send_message_stream(chat_message: ChatMessage):
     """Send a message to AI with streaming response and tool calling"""
     
     try:
-        logger.info(f"Stream request for project {chat_message.project_id}")
+        logger.info("Stream request for project %s", chat_message.project_id)
         
         # Get project path from database
-        with get_db() as conn:
-            cursor = conn.execute("SELECT path FROM projects WHERE id = ?", (chat_message.project_id,))
-            row = cursor.fetchone()
-            if not row:
-                logger.error(f"Project {chat_message.project_id} not found")
-                raise HTTPException(status_code=404, detail="Project not found")
-            project_path = row["path"]
+        project_path = await get_project_path(chat_message.project_id)
+        if project_path is None:
+            logger.error("Project %s not found", chat_message.project_id)
+            raise HTTPException(status_code=404, detail="Project not found")
         
-        # Create chat manager
-        chat_manager = await create_chat_manager(chat_message.project_id, project_path)
-        if not chat_manager:
-            logger.error(f"Failed to create chat manager for project {chat_message.project_id}")
-            raise HTTPException(status_code=400, detail="AI provider not configured or API key missing")
-        
-        # Create session for this conversation
+        # Reuse the chat manager of a session that is still open for this
+        # project (e.g. a new message instead of a pending tool approval)
         session_manager = get_session_manager()
-        session_id = session_manager.create_session(chat_message.project_id, project_path, chat_manager)
+        session = session_manager.get_session(chat_message.session_id) if chat_message.session_id else None
+        if session is not None and session.project_id == chat_message.project_id:
+            chat_manager = session.chat_manager
+            session_id = session.session_id
+            logger.info("Reusing session %s", session_id)
+        else:
+            # Create chat manager
+            chat_manager = await create_chat_manager(chat_message.project_id, project_path)
+            if not chat_manager:
+                logger.error("Failed to create chat manager for project %s", chat_message.project_id)
+                raise HTTPException(status_code=400, detail="AI provider not configured or API key missing")
+            
+            # Create session for this conversation
+            session_id = session_manager.create_session(chat_message.project_id, project_path, chat_manager)
             
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in stream endpoint: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("Unexpected error in stream endpoint: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
     
     # Get conversation history (always enabled)
-    conversation_history = []
     chat_memory = get_chat_memory()
     history = chat_memory.get_recent_history(chat_message.project_id, limit=20)
     
-    # Convert to CoreChatMessage format
-    for msg in history:
-        conversation_history.append(CoreChatMessage(
-            role="user",
-            content=msg.message
-        ))
-        conversation_history.append(CoreChatMessage(
-            role="assistant",
-            content=msg.response
-        ))
+    # Convert to CoreChatMessage format: a user/assistant pair per saved row
+    conversation_history = [
+        message
+        for msg in history
+        for message in (CoreChatMessage("user", msg.message), CoreChatMessage("assistant", msg.response))
+    ]
     
     async def stream_generator():
         try:
-            logger.info(f"Starting conversation stream for: {chat_message.message}")
+            logger.info("Starting conversation stream for: %s", chat_message.message)
             async for step in chat_manager.start_conversation(
                 user_message=chat_message.message,
                 conversation_history=conversation_history
             ):
-                logger.info(f"Yielding step: state={step.state}, content={step.content[:100] if step.content else None}, tool_calls={len(step.tool_calls) if step.tool_calls else 0}")
-                
-                # Convert tool_calls to JSON serializable format
-                tool_calls_json = None
-                if step.tool_calls:
-                    tool_calls_json = [
-                        {
-                            "id": tc.id,
-                            "name": tc.name,
-                            "arguments": tc.arguments
-                        }
-                        for tc in step.tool_calls
-                    ]
+                logger.info(
+                    "Yielding step: state=%s, content_length=%d, tool_calls=%d",
+                    step.state.value, len(step.content or ""), len(step.tool_calls or ())
+                )
                 
-                # Send step as JSON line
-                step_data = {
-                    "type": "conversation_step",
-                    "state": step.state.value,
-                    "content": step.content,
-                    "tool_calls": tool_calls_json,
-                    "tool_results": step.tool_results,
-                    "error": step.error,
-                    "session_id": session_id,
-                    "timestamp": datetime.now().isoformat()
-                }
-                yield f"data: {json.dumps(step_data)}\n\n"
-                logger.info(f"Successfully yielded step: {step.state.value}")
+                yield _encode_step(step, session_id)
+                logger.info("Successfully yielded step: %s", step.state.value)
                 
                 # Clean up session when conversation is complete (no tool calls)
                 if step.state.value == "completed":
                     session_manager.cleanup_session(session_id)
-                    logger.info(f"Cleaned up completed session {session_id}")
+                    logger.info("Cleaned up completed session %s", session_id)
                 elif step.state.value == "tool_approval":
-                    logger.info(f"Tool approval step yielded, keeping session {session_id} alive")
+                    logger.info("Tool approval step yielded, keeping session %s alive", session_id)
             
             logger.info("Conversation stream completed")
                 
@@ -364,14 +334,14 @@ async def send_message_stream(chat_message: ChatMessage):
             error_data = {
                 "type": "error",
                 "error": str(e),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now()
             }
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield b"data: " + orjson.dumps(error_data, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
     
     return StreamingResponse(
         stream_generator(),
-        media_type="text/plain",
-        headers={"Cache-Control": "no-cache"}
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS
     )
 
 @router.post("/chat/tool-approval")
@@ -383,16 +353,16 @@ async def handle_tool_approval(approval_request: ToolApprovalRequest):
     session = session_manager.get_session(approval_request.session_id)
     
     if not session:
-        logger.error(f"Session {approval_request.session_id} not found or expired")
+        logger.error("Session %s not found or expired", approval_request.session_id)
         raise HTTPException(status_code=404, detail="Session not found or expired")
     
     if session.project_id != approval_request.project_id:
-        logger.error(f"Session project mismatch: {session.project_id} != {approval_request.project_id}")
+        logger.error("Session project mismatch: %s != %s", session.project_id, approval_request.project_id)
         raise HTTPException(status_code=400, detail="Session project mismatch")
     
     # Use the existing chat manager with preserved state
     chat_manager = session.chat_manager
-    logger.info(f"Using session {approval_request.session_id} with {len(chat_manager.messages)} messages")
+    logger.info("Using session %s with %d messages", approval_request.session_id, len(chat_manager.messages))
     
     async def approval_stream_generator():
         try:
@@ -400,48 +370,25 @@ async def handle_tool_approval(approval_request: ToolApprovalRequest):
                 approved_tools=approval_request.approved_tools,
                 denied_tools=approval_request.denied_tools
             ):
-                # Convert tool_calls to JSON serializable format (same as original endpoint)
-                tool_calls_json = None
-                if step.tool_calls:
-                    tool_calls_json = [
-                        {
-                            "id": tc.id,
-                            "name": tc.name,
-                            "arguments": tc.arguments
-                        }
-                        for tc in step.tool_calls
-                    ]
-                
-                # Send step as JSON line
-                step_data = {
-                    "type": "conversation_step",
-                    "state": step.state.value,
-                    "content": step.content,
-                    "tool_calls": tool_calls_json,
-                    "tool_results": step.tool_results,
-                    "error": step.error,
-                    "session_id": approval_request.session_id,
-                    "timestamp": datetime.now().isoformat()
-                }
-                yield f"data: {json.dumps(step_data)}\n\n"
+                yield _encode_step(step, approval_request.session_id)
                 
                 # Clean up session when conversation is complete
                 if step.state.value == "completed":
                     session_manager.cleanup_session(approval_request.session_id)
-                    logger.info(f"Cleaned up completed session {approval_request.session_id}")
+                    logger.info("Cleaned up completed session %s", approval_request.session_id)
                 
         except Exception as e:
             error_data = {
                 "type": "error",
                 "error": str(e),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now()
             }
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield b"data: " + orjson.dumps(error_data, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
     
     return StreamingResponse(
         approval_stream_generator(),
-        media_type="text/plain",
-        headers={"Cache-Control": "no-cache"}
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS
     )
 
 @router.delete("/chat/history/{project_id}")
@@ -458,5 +405,5 @@ async def clear_chat_history(project_id: int):
         }
         
     except Exception as e:
-        logger.error(f"Error clearing chat history: {str(e)}")
+        logger.error("Error clearing chat history: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to clear chat history: {str(e)}")
\ No newline at end of file
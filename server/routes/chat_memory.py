@@ -3,11 +3,15 @@ Chat Memory Routes
 API endpoints for managing project chat history
 """
 
-from typing import List, Optional
+import asyncio
+import logging
+import orjson
+from typing import AsyncIterator, List, Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from memory.chat_memory import get_chat_memory, ChatMessage
+from memory.chat_memory import ChatMemory, ChatMessage, get_chat_memory
 
 
 # Request/Response models
@@ -42,6 +46,49 @@ class SearchResponse(BaseModel):
 # Create router
 router = APIRouter(prefix="/projects", tags=["chat-memory"])
 
+logger = logging.getLogger(__name__)
+
+# Messages encoded per chunk of a streamed chat history response
+_HISTORY_CHUNK_SIZE = 100
+
+
+async def _stream_history(
+    chat_memory: ChatMemory,
+    project_id: int,
+    page: List[ChatMessage]
+) -> AsyncIterator[bytes]:
+    """
+    Encode chat history as a ChatHistoryResponse body page by page
+    
+    Each further page is read in a worker thread under its own reader
+    checkout, so a slow client never holds a ChatMemory connection.
+    
+    Args:
+        chat_memory: ChatMemory to read further pages from
+        project_id: Project the history belongs to
+        page: First page of messages, already read by the handler
+        
+    Yields:
+        bytes: JSON body chunks; total_count is written after the messages
+    """
+    yield b'{"messages":['
+    total_count = 0
+    try:
+        while page:
+            # orjson encodes the ChatMessage dataclasses with the to_dict() keys
+            yield (b"," if total_count else b"") + b",".join(map(orjson.dumps, page))
+            total_count += len(page)
+            if len(page) < _HISTORY_CHUNK_SIZE:
+                break
+            page = await asyncio.to_thread(
+                chat_memory.get_history_page, project_id, page[-1].id, _HISTORY_CHUNK_SIZE
+            )
+    except Exception as e:
+        # The status line is already sent, so the body is cut short instead
+        logger.error("Failed to stream chat history for project %s: %s", project_id, e, exc_info=True)
+        raise
+    yield b'],"total_count":%d,"project_id":%d}' % (total_count, project_id)
+
 
 @router.get("/{project_id}/chat/history", response_model=ChatHistoryResponse)
 async def get_chat_history(
@@ -61,11 +108,20 @@ async def get_chat_history(
     try:
         chat_memory = get_chat_memory()
         
-        if limit:
-            messages = chat_memory.get_recent_history(project_id, limit)
-        else:
-            messages = chat_memory.get_project_history(project_id)
+        if not limit:
+            # The full history can be large, so it is read and encoded a page
+            # at a time instead of building the whole list; counting the rows
+            # as they go gives the total. The first page is read here so that
+            # errors still become a 500 response
+            first_page = await asyncio.to_thread(
+                chat_memory.get_history_page, project_id, 0, _HISTORY_CHUNK_SIZE
+            )
+            return StreamingResponse(
+                _stream_history(chat_memory, project_id, first_page),
+                media_type="application/json"
+            )
         
+        messages = chat_memory.get_recent_history(project_id, limit)
         total_count = chat_memory.get_message_count(project_id)
         
         return ChatHistoryResponse(
@@ -4,12 +4,15 @@ API endpoints for CRUD operations on projects
 """
 
 from typing import List, Optional
-from datetime import datetime
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import sqlite3
 from pathlib import Path
 
+from memory.chat_memory import get_chat_memory
+from utils.database import SQL_NOW, get_db, invalidate_project_exists
+from routes.chat import invalidate_project_cache
+
 # Request/Response models
 class ProjectCreate(BaseModel):
     name: str
@@ -37,19 +40,19 @@ class Project(BaseModel):
     memory_enabled: bool = True
     tools_enabled: bool = True
 
-# Database setup
-DB_PATH = Path.home() / ".ai-cli" / "ai_cli.db"
-
-def get_db():
-    """Get database connection"""
-    DB_PATH.parent.mkdir(exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
 # Create router
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+# Statement text is built once here: pooled connections cache prepared
+# statements by their exact SQL, so every request reuses the same entries
+_SELECT_PROJECT_SQL = "SELECT * FROM projects WHERE id = ?"
+_INSERT_PROJECT_SQL = f"""
+    INSERT INTO projects (name, path, description, created_at)
+    VALUES (?, ?, ?, {SQL_NOW})
+"""
+_TOUCH_PROJECT_SQL = f"UPDATE projects SET last_used = {SQL_NOW} WHERE id = ?"
+
 
 @router.get("", response_model=List[Project])
 async def get_projects():
@@ -90,16 +93,14 @@ async def create_project(project: ProjectCreate):
                 )
             
             # Create project
-            cursor = conn.execute("""
-                INSERT INTO projects (name, path, description, created_at)
-                VALUES (?, ?, ?, ?)
-            """, (project.name, project.path, project.description, datetime.now().isoformat()))
+            cursor = conn.execute(_INSERT_PROJECT_SQL, (project.name, project.path, project.description))
             
             project_id = cursor.lastrowid
+            invalidate_project_exists(project_id)
             conn.commit()
             
             # Return created project
-            cursor = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
+            cursor = conn.execute(_SELECT_PROJECT_SQL, (project_id,))
             row = cursor.fetchone()
             
             return Project(
@@ -127,7 +128,7 @@ async def update_project(project_id: int, project_update: ProjectUpdate):
     """Update a project"""
     with get_db() as conn:
         # Check if project exists
-        cursor = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
+        cursor = conn.execute(_SELECT_PROJECT_SQL, (project_id,))
         existing = cursor.fetchone()
         if not existing:
             raise HTTPException(status_code=404, detail="Project not found")
@@ -164,9 +165,10 @@ async def update_project(project_id: int, project_update: ProjectUpdate):
             query = f"UPDATE projects SET {', '.join(updates)} WHERE id = ?"
             conn.execute(query, params)
             conn.commit()
+            invalidate_project_cache(project_id)
         
         # Return updated project
-        cursor = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
+        cursor = conn.execute(_SELECT_PROJECT_SQL, (project_id,))
         row = cursor.fetchone()
         
         return Project(
@@ -191,25 +193,24 @@ async def delete_project(project_id: int):
         if not cursor.fetchone():
             raise HTTPException(status_code=404, detail="Project not found")
         
+        # chat_history and project_settings rows go with it (ON DELETE CASCADE)
         conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-        conn.execute("DELETE FROM chat_history WHERE project_id = ?", (project_id,))
         conn.commit()
-        
-        return {"message": "Project deleted successfully"}
+    
+    get_chat_memory().invalidate_project(project_id)
+    invalidate_project_cache(project_id)
+    invalidate_project_exists(project_id)
+    
+    return {"message": "Project deleted successfully"}
 
 
 @router.post("/{project_id}/use")
 async def use_project(project_id: int):
     """Mark project as used (update last_used timestamp)"""
     with get_db() as conn:
-        cursor = conn.execute("SELECT id FROM projects WHERE id = ?", (project_id,))
-        if not cursor.fetchone():
+        cursor = conn.execute(_TOUCH_PROJECT_SQL, (project_id,))
+        if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Project not found")
-        
-        conn.execute(
-            "UPDATE projects SET last_used = ? WHERE id = ?",
-            (datetime.now().isoformat(), project_id)
-        )
         conn.commit()
         
         return {"message": "Project usage updated"}
\ No newline at end of file
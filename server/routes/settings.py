@@ -3,14 +3,18 @@ Settings Routes
 API endpoints for global and project settings management
 """
 
-import json
-from datetime import datetime
+import hashlib
+import orjson
 from typing import Optional
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 import sqlite3
 from pathlib import Path
 
+from memory.chat_memory import get_chat_memory
+from utils.database import SQL_NOW, get_db, project_exists
+from routes.chat import invalidate_project_cache
+
 # Request/Response models
 class GlobalSettings(BaseModel):
     config_name: str = "global"
@@ -20,15 +24,6 @@ class ProjectSettings(BaseModel):
     project_id: int
     config_data: dict
 
-# Database setup
-DB_PATH = Path.home() / ".ai-cli" / "ai_cli.db"
-
-def get_db():
-    """Get database connection"""
-    DB_PATH.parent.mkdir(exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
 # Default global settings (UI, system-wide preferences)
 DEFAULT_GLOBAL_SETTINGS = {
@@ -137,9 +132,73 @@ DEFAULT_PROJECT_SETTINGS = {
     }
 }
 
+# The defaults never change at runtime, so they are serialized once: resets
+# store these strings and the default endpoints send them as-is
+_DEFAULT_GLOBAL_JSON = orjson.dumps(DEFAULT_GLOBAL_SETTINGS).decode()
+_DEFAULT_PROJECT_JSON = orjson.dumps(DEFAULT_PROJECT_SETTINGS).decode()
+
+# Content-derived ETags let clients revalidate the defaults with a 304; the
+# defaults only change with a new server version, which changes the tag
+_DEFAULT_GLOBAL_ETAG = '"%s"' % hashlib.sha1(_DEFAULT_GLOBAL_JSON.encode()).hexdigest()
+_DEFAULT_PROJECT_ETAG = '"%s"' % hashlib.sha1(_DEFAULT_PROJECT_JSON.encode()).hexdigest()
+_DEFAULTS_CACHE_CONTROL = "public, max-age=86400, immutable"
+
 # Create router
 router = APIRouter(prefix="/settings", tags=["settings"])
 
+# Settings writes are single upserts on the UNIQUE config_name / project_id
+# columns; created_at is only set by the first insert
+_UPSERT_GLOBAL_SQL = f"""
+    INSERT INTO global_settings (config_name, config_data, created_at, updated_at)
+    VALUES (?, ?, {SQL_NOW}, {SQL_NOW})
+    ON CONFLICT(config_name) DO UPDATE SET
+        config_data = excluded.config_data,
+        updated_at = excluded.updated_at
+"""
+
+_UPSERT_PROJECT_SQL = f"""
+    INSERT INTO project_settings (project_id, config_data, created_at, updated_at)
+    VALUES (?, ?, {SQL_NOW}, {SQL_NOW})
+    ON CONFLICT(project_id) DO UPDATE SET
+        config_data = excluded.config_data,
+        updated_at = excluded.updated_at
+"""
+
+
+def _require_project(project_id: int):
+    """
+    Raise 404 unless the project exists
+    
+    Uses the shared existence cache, so repeated settings calls for a
+    project skip the existence query.
+    
+    Args:
+        project_id: Project to check
+        
+    Raises:
+        HTTPException: If the project does not exist
+    """
+    if not project_exists(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+
+def _defaults_response(request: Request, content: str, etag: str) -> Response:
+    """
+    Build a cacheable response for default settings
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        content: Serialized default settings
+        etag: ETag of content
+        
+    Returns:
+        Response: 304 if the client already has this version, else the JSON
+    """
+    headers = {"ETag": etag, "Cache-Control": _DEFAULTS_CACHE_CONTROL}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
+
 
 # Global settings endpoints
 @router.get("/global")
@@ -150,68 +209,33 @@ async def get_global_settings():
         row = cursor.fetchone()
         
         if row:
-            return json.loads(row["config_data"])
+            # Stored as JSON text already, so it is sent without a decode/encode round trip
+            return Response(content=row["config_data"], media_type="application/json")
         else:
             # Return default global settings if none exist
-            return DEFAULT_GLOBAL_SETTINGS
+            return Response(content=_DEFAULT_GLOBAL_JSON, media_type="application/json")
 
 
 @router.put("/global")
 async def update_global_settings(settings: GlobalSettings):
     """Update global settings"""
     with get_db() as conn:
-        cursor = conn.execute("SELECT id FROM global_settings WHERE config_name = ?", (settings.config_name,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Update existing settings
-            conn.execute("""
-                UPDATE global_settings SET config_data = ?, updated_at = ? WHERE config_name = ?
-            """, (json.dumps(settings.config_data), datetime.now().isoformat(), settings.config_name))
-        else:
-            # Insert new settings
-            conn.execute("""
-                INSERT INTO global_settings (config_name, config_data, created_at, updated_at)
-                VALUES (?, ?, ?, ?)
-            """, (
-                settings.config_name, 
-                json.dumps(settings.config_data), 
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
-            ))
-        
+        conn.execute(_UPSERT_GLOBAL_SQL, (settings.config_name, orjson.dumps(settings.config_data).decode()))
         conn.commit()
         return {"message": "Global settings updated successfully"}
 
 
 @router.get("/global/defaults")
-async def get_default_global_settings():
+async def get_default_global_settings(request: Request):
     """Get default global settings"""
-    return DEFAULT_GLOBAL_SETTINGS
+    return _defaults_response(request, _DEFAULT_GLOBAL_JSON, _DEFAULT_GLOBAL_ETAG)
 
 
 @router.post("/global/reset")
 async def reset_global_settings():
     """Reset global settings to defaults"""
     with get_db() as conn:
-        cursor = conn.execute("SELECT id FROM global_settings WHERE config_name = ?", ("global",))
-        existing = cursor.fetchone()
-        
-        if existing:
-            conn.execute("""
-                UPDATE global_settings SET config_data = ?, updated_at = ? WHERE config_name = ?
-            """, (json.dumps(DEFAULT_GLOBAL_SETTINGS), datetime.now().isoformat(), "global"))
-        else:
-            conn.execute("""
-                INSERT INTO global_settings (config_name, config_data, created_at, updated_at)
-                VALUES (?, ?, ?, ?)
-            """, (
-                "global", 
-                json.dumps(DEFAULT_GLOBAL_SETTINGS), 
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
-            ))
-        
+        conn.execute(_UPSERT_GLOBAL_SQL, ("global", _DEFAULT_GLOBAL_JSON))
         conn.commit()
         return {"message": "Global settings reset to defaults"}
 
@@ -220,113 +244,61 @@ async def reset_global_settings():
 @router.get("/projects/{project_id}")
 async def get_project_settings(project_id: int):
     """Get project-specific settings"""
+    _require_project(project_id)
+    
     with get_db() as conn:
-        # Check if project exists
-        cursor = conn.execute("SELECT id FROM projects WHERE id = ?", (project_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Project not found")
-        
         # Get project settings
         cursor = conn.execute("SELECT config_data FROM project_settings WHERE project_id = ?", (project_id,))
         row = cursor.fetchone()
         
         if row:
-            return json.loads(row["config_data"])
+            # Stored as JSON text already, so it is sent without a decode/encode round trip
+            return Response(content=row["config_data"], media_type="application/json")
         else:
             # Return default project settings if none exist
-            return DEFAULT_PROJECT_SETTINGS
+            return Response(content=_DEFAULT_PROJECT_JSON, media_type="application/json")
 
 
 @router.put("/projects/{project_id}")
 async def update_project_settings(project_id: int, settings: ProjectSettings):
     """Update project-specific settings"""
+    _require_project(project_id)
+    
     with get_db() as conn:
-        # Check if project exists
-        cursor = conn.execute("SELECT id FROM projects WHERE id = ?", (project_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Project not found")
-        
-        # Check if project settings exist
-        cursor = conn.execute("SELECT id FROM project_settings WHERE project_id = ?", (project_id,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Update existing settings
-            conn.execute("""
-                UPDATE project_settings SET config_data = ?, updated_at = ? WHERE project_id = ?
-            """, (json.dumps(settings.config_data), datetime.now().isoformat(), project_id))
-        else:
-            # Insert new settings
-            conn.execute("""
-                INSERT INTO project_settings (project_id, config_data, created_at, updated_at)
-                VALUES (?, ?, ?, ?)
-            """, (
-                project_id,
-                json.dumps(settings.config_data), 
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
-            ))
-        
+        conn.execute(_UPSERT_PROJECT_SQL, (project_id, orjson.dumps(settings.config_data).decode()))
         conn.commit()
-        return {"message": "Project settings updated successfully"}
+    
+    invalidate_project_cache(project_id)
+    return {"message": "Project settings updated successfully"}
 
 
 @router.get("/projects/{project_id}/defaults")
-async def get_default_project_settings(project_id: int):
+async def get_default_project_settings(project_id: int, request: Request):
     """Get default project settings"""
-    with get_db() as conn:
-        # Check if project exists
-        cursor = conn.execute("SELECT id FROM projects WHERE id = ?", (project_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Project not found")
+    _require_project(project_id)
     
-    return DEFAULT_PROJECT_SETTINGS
+    return _defaults_response(request, _DEFAULT_PROJECT_JSON, _DEFAULT_PROJECT_ETAG)
 
 
 @router.post("/projects/{project_id}/reset")
 async def reset_project_settings(project_id: int):
     """Reset project settings to defaults"""
+    _require_project(project_id)
+    
     with get_db() as conn:
-        # Check if project exists
-        cursor = conn.execute("SELECT id FROM projects WHERE id = ?", (project_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Project not found")
-        
-        # Check if project settings exist
-        cursor = conn.execute("SELECT id FROM project_settings WHERE project_id = ?", (project_id,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            conn.execute("""
-                UPDATE project_settings SET config_data = ?, updated_at = ? WHERE project_id = ?
-            """, (json.dumps(DEFAULT_PROJECT_SETTINGS), datetime.now().isoformat(), project_id))
-        else:
-            conn.execute("""
-                INSERT INTO project_settings (project_id, config_data, created_at, updated_at)
-                VALUES (?, ?, ?, ?)
-            """, (
-                project_id,
-                json.dumps(DEFAULT_PROJECT_SETTINGS), 
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
-            ))
-        
+        conn.execute(_UPSERT_PROJECT_SQL, (project_id, _DEFAULT_PROJECT_JSON))
         conn.commit()
-        return {"message": "Project settings reset to defaults"}
+    
+    invalidate_project_cache(project_id)
+    return {"message": "Project settings reset to defaults"}
 
 
 @router.post("/projects/{project_id}/actions/clear_history")
 async def clear_project_chat_history(project_id: int):
     """Clear all chat history for a project"""
-    with get_db() as conn:
-        # Check if project exists
-        cursor = conn.execute("SELECT id FROM projects WHERE id = ?", (project_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Project not found")
-        
-        # Delete all chat history for this project
-        cursor = conn.execute("DELETE FROM chat_history WHERE project_id = ?", (project_id,))
-        deleted_count = cursor.rowcount
-        
-        conn.commit()
-        return {"message": f"Cleared {deleted_count} messages from chat history", "deleted_count": deleted_count}
\ No newline at end of file
+    _require_project(project_id)
+    
+    # Delete through ChatMemory so its cached history is invalidated
+    deleted_count = get_chat_memory().clear_project_history(project_id)
+    
+    return {"message": f"Cleared {deleted_count} messages from chat history", "deleted_count": deleted_count}
\ No newline at end of file
@@ -0,0 +1,325 @@
+"""
+Tests for ChatMemory
+"""
+
+import dataclasses
+import sqlite3
+import pytest
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+from memory import chat_memory
+from memory.chat_memory import ChatMemory, ChatMessage
+from utils.database import ConnectionPool
+
+
+class TestChatMemory:
+    """Test cases for ChatMemory"""
+    
+    @pytest.fixture
+    def db_path(self, empty_temp_dir) -> Path:
+        """Create a database with the chat_history table"""
+        db_path = Path(empty_temp_dir) / "ai_cli.db"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("""
+                CREATE TABLE chat_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    project_id INTEGER NOT NULL,
+                    message TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    timestamp TEXT NOT NULL
+                )
+            """)
+        return db_path
+    
+    @pytest.fixture
+    def memory(self, db_path) -> ChatMemory:
+        """Create ChatMemory instance"""
+        return ChatMemory(db_path)
+    
+    def test_save_and_load_history(self, memory):
+        """Test saved messages come back oldest first"""
+        memory.save_message(1, "first", "reply 1")
+        memory.save_message(1, "second", "reply 2")
+        memory.save_message(2, "other project", "reply")
+        
+        history = memory.get_project_history(1)
+        
+        assert [msg.message for msg in history] == ["first", "second"]
+        assert history[0].response == "reply 1"
+        assert memory.get_message_count(1) == 2
+        assert memory.get_message_count(2) == 1
+    
+    def test_timestamps_use_isoformat(self, memory):
+        """Test saved rows carry datetime.isoformat() timestamps like earlier rows"""
+        memory.save_message(1, "single", "reply")
+        memory.save_messages(1, [("batched", "reply")])
+        
+        for msg in memory.get_project_history(1):
+            assert datetime.fromisoformat(msg.timestamp).isoformat() == msg.timestamp
+    
+    def test_save_messages_batch(self, memory):
+        """Test saving several message pairs at once"""
+        saved = memory.save_messages(1, [("first", "reply 1"), ("second", "reply 2")])
+        
+        assert saved == 2
+        assert memory.save_messages(1, []) == 0
+        assert [msg.message for msg in memory.get_project_history(1)] == ["first", "second"]
+    
+    def test_iter_project_history_streams_rows(self, memory):
+        """Test iter_project_history yields the same rows as get_project_history"""
+        memory.save_messages(1, [("one", "r1"), ("two", "r2"), ("three", "r3")])
+        
+        streamed = memory.iter_project_history(1, limit=2)
+        
+        assert next(streamed).message == "one"
+        assert [msg.message for msg in streamed] == ["two"]
+        assert list(memory.iter_project_history(1)) == memory.get_project_history(1)
+    
+    def test_iter_project_history_returns_reader(self, db_path):
+        """Test abandoned history iterators neither leak nor block pooled readers"""
+        memory = ChatMemory(db_path, reader_pool_size=2)
+        memory.save_messages(1, [("one", "r1"), ("two", "r2")])
+        
+        for msg in memory.iter_project_history(1):
+            break
+        assert memory._reader_pool.qsize() == 2
+        
+        # More open iterators than pooled readers: reads still go through
+        held = [memory.iter_project_history(1) for _ in range(3)]
+        assert [next(streamed).message for streamed in held] == ["one"] * 3
+        assert memory.get_message_count(1) == 2
+        
+        for streamed in held:
+            streamed.close()
+        assert memory._reader_pool.qsize() == 2
+    
+    def test_history_pages(self, memory):
+        """Test history pages continue after the last id of the previous page"""
+        memory.save_messages(1, [("one", "r1"), ("two", "r2"), ("three", "r3")])
+        memory.save_message(2, "other project", "reply")
+        
+        first = memory.get_history_page(1, limit=2)
+        rest = memory.get_history_page(1, after_id=first[-1].id, limit=2)
+        
+        assert [msg.message for msg in first] == ["one", "two"]
+        assert [msg.message for msg in rest] == ["three"]
+        assert memory.get_history_page(1, after_id=rest[-1].id) == []
+    
+    def test_recent_history_is_chronological(self, memory):
+        """Test recent history returns the newest messages in chronological order"""
+        for i in range(5):
+            memory.save_message(1, f"message {i}", f"reply {i}")
+        
+        recent = memory.get_recent_history(1, limit=2)
+        
+        assert [msg.message for msg in recent] == ["message 3", "message 4"]
+        assert [msg.message for msg in memory.get_project_history(1, limit=2)] == ["message 0", "message 1"]
+    
+    @pytest.fixture
+    def clock(self, monkeypatch) -> SimpleNamespace:
+        """Freeze the clock ChatMemory uses for its cache windows"""
+        clock = SimpleNamespace(now=1000.0)
+        monkeypatch.setattr(chat_memory, "time", SimpleNamespace(monotonic=lambda: clock.now))
+        return clock
+    
+    def test_cached_reads_see_writes(self, memory, db_path, clock):
+        """Test cached recent history and counts are invalidated by writes"""
+        memory.save_message(1, "first", "reply")
+        assert [msg.message for msg in memory.get_recent_history(1)] == ["first"]
+        assert memory.get_message_count(1) == 1
+        
+        message_id = memory.save_message(1, "second", "reply")
+        assert [msg.message for msg in memory.get_recent_history(1)] == ["first", "second"]
+        assert memory.get_message_count(1) == 2
+        
+        memory.delete_message(message_id)
+        assert memory.get_message_count(1) == 1
+        
+        # Writes that bypass ChatMemory need an explicit invalidation
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM chat_history WHERE project_id = 1")
+        assert memory.get_message_count(1) == 1
+        memory.invalidate_project(1)
+        assert memory.get_message_count(1) == 0
+        assert memory.get_recent_history(1) == []
+    
+    def test_cached_reads_expire(self, db_path, clock):
+        """Test writes made outside ChatMemory are seen once the cache TTL passes"""
+        memory = ChatMemory(db_path, cache_ttl=5.0)
+        memory.save_message(1, "first", "reply")
+        assert memory.get_message_count(1) == 1
+        
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "INSERT INTO chat_history (project_id, message, response, timestamp) VALUES (?, ?, ?, ?)",
+                (1, "other process", "reply", "2024-01-01T00:00:00")
+            )
+        assert memory.get_message_count(1) == 1
+        
+        clock.now += 5.0
+        assert memory.get_message_count(1) == 2
+        assert [msg.message for msg in memory.get_recent_history(1)] == ["first", "other process"]
+    
+    def test_zero_ttl_disables_read_cache(self, db_path):
+        """Test cache_ttl=0 makes every read see writes made outside ChatMemory"""
+        memory = ChatMemory(db_path, cache_ttl=0)
+        memory.save_message(1, "first", "reply")
+        assert memory.get_message_count(1) == 1
+        
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "INSERT INTO chat_history (project_id, message, response, timestamp) VALUES (?, ?, ?, ?)",
+                (1, "other process", "reply", "2024-01-01T00:00:00")
+            )
+        
+        assert memory.get_message_count(1) == 2
+        assert [msg.message for msg in memory.get_recent_history(1)] == ["first", "other process"]
+    
+    def test_delete_and_clear(self, memory):
+        """Test deleting a single message and clearing a project"""
+        message_id = memory.save_message(1, "keep", "reply")
+        memory.save_message(1, "drop", "reply")
+        
+        assert memory.delete_message(message_id) is True
+        assert memory.delete_message(message_id) is False
+        assert memory.clear_project_history(1) == 1
+        assert memory.get_message_count(1) == 0
+    
+    def test_search_messages(self, memory):
+        """Test searching message and response text"""
+        memory.save_message(1, "how do I parse json", "use the json module")
+        memory.save_message(1, "hello there", "hi")
+        
+        results = memory.search_messages(1, "json")
+        
+        assert len(results) == 1
+        assert results[0].message == "how do I parse json"
+    
+    def test_search_prefix_and_special_characters(self, memory):
+        """Test search matches word prefixes and tolerates FTS syntax in the query"""
+        memory.save_message(1, "refactor the parser", "done")
+        
+        assert len(memory.search_messages(1, "pars")) == 1
+        assert memory.search_messages(1, 'parser" OR "x') == []
+        assert memory.search_messages(2, "parser") == []
+    
+    def test_search_matches_word_forms(self, memory):
+        """Test search finds other forms of the same word"""
+        memory.save_message(1, "parsing the config", "done")
+        
+        assert [msg.message for msg in memory.search_messages(1, "parse")] == ["parsing the config"]
+        assert [msg.message for msg in memory.search_messages(1, "configs")] == ["parsing the config"]
+    
+    def test_search_does_not_match_inside_words(self, memory):
+        """Test search matches whole words and prefixes, not text inside a word"""
+        memory.save_message(1, "show the response", "done")
+        
+        assert len(memory.search_messages(1, "resp")) == 1
+        assert memory.search_messages(1, "ponse") == []
+    
+    def test_search_without_words(self, memory):
+        """Test empty and punctuation-only queries fall back to substring matching"""
+        memory.save_message(1, "what?!", "no idea")
+        memory.save_message(1, "hello", "hi")
+        memory.save_message(2, "other project", "reply")
+        
+        assert [msg.message for msg in memory.search_messages(1, "")] == ["hello", "what?!"]
+        assert [msg.message for msg in memory.search_messages(1, "", limit=1)] == ["hello"]
+        assert [msg.message for msg in memory.search_messages(1, "?!")] == ["what?!"]
+        assert memory.search_messages(1, "...") == []
+    
+    def test_search_indexes_existing_rows(self, db_path):
+        """Test rows written before the search index existed are searchable"""
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "INSERT INTO chat_history (project_id, message, response, timestamp) VALUES (?, ?, ?, ?)",
+                (1, "legacy message", "legacy reply", "2024-01-01T00:00:00")
+            )
+        
+        memory = ChatMemory(db_path)
+        
+        assert [msg.message for msg in memory.search_messages(1, "legacy")] == ["legacy message"]
+        assert memory.get_message_count(1) == 1
+    
+    def test_history_cascades_on_project_delete(self, db_path):
+        """Test an existing chat_history is rebuilt to cascade project deletes"""
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY)")
+            conn.execute("INSERT INTO projects (id) VALUES (1), (2)")
+            conn.execute(
+                "INSERT INTO chat_history (project_id, message, response, timestamp) VALUES (?, ?, ?, ?)",
+                (1, "legacy message", "legacy reply", "2024-01-01T00:00:00")
+            )
+        
+        memory = ChatMemory(db_path)
+        memory.save_message(2, "kept", "reply")
+        
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("DELETE FROM projects WHERE id = 1")
+        memory.invalidate_project(1)
+        
+        assert memory.get_project_history(1) == []
+        assert memory.search_messages(1, "legacy") == []
+        assert [msg.message for msg in memory.get_project_history(2)] == ["kept"]
+    
+    def test_project_delete_through_pool_removes_history(self, db_path):
+        """Test a single project DELETE on a migrated database takes its history along"""
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY)")
+            conn.execute("INSERT INTO projects (id) VALUES (1), (2)")
+            conn.executemany(
+                "INSERT INTO chat_history (project_id, message, response, timestamp) VALUES (?, ?, ?, ?)",
+                [
+                    (1, "legacy message", "legacy reply", "2024-01-01T00:00:00"),
+                    (2, "kept", "reply", "2024-01-01T00:00:00")
+                ]
+            )
+        
+        memory = ChatMemory(db_path)
+        
+        # Same connection setup and statement as the delete_project route
+        pool = ConnectionPool(db_path)
+        try:
+            with pool.connection() as conn:
+                conn.execute("DELETE FROM projects WHERE id = ?", (1,))
+        finally:
+            pool.close()
+        memory.invalidate_project(1)
+        
+        assert memory.get_message_count(1) == 0
+        assert [msg.message for msg in memory.get_project_history(2)] == ["kept"]
+    
+    def test_creates_schema_on_empty_database(self, empty_temp_dir):
+        """Test ChatMemory creates chat_history itself on a fresh database"""
+        memory = ChatMemory(Path(empty_temp_dir) / "fresh.db")
+        memory.save_message(1, "hello", "hi")
+        
+        assert [msg.message for msg in memory.get_project_history(1)] == ["hello"]
+        assert memory.get_message_count(1) == 1
+    
+    def test_database_uses_wal(self, memory, db_path):
+        """Test the database is switched to WAL journal mode"""
+        memory.save_message(1, "message", "reply")
+        memory.checkpoint()
+        
+        with sqlite3.connect(db_path) as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        
+        assert journal_mode == "wal"
+    
+    def test_chat_message_is_immutable(self):
+        """Test ChatMessage rows are frozen and serialize to a dict"""
+        msg = ChatMessage(1, 2, "hello", "hi", "2024-01-01T00:00:00")
+        
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            msg.message = "changed"
+        assert msg.to_dict() == {
+            "id": 1,
+            "project_id": 2,
+            "message": "hello",
+            "response": "hi",
+            "timestamp": "2024-01-01T00:00:00"
+        }
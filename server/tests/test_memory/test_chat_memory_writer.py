@@ -0,0 +1,54 @@
+"""
+Tests for ChatMemoryWriter
+"""
+
+import asyncio
+import pytest
+from pathlib import Path
+
+from memory.chat_memory import ChatMemory
+from memory.chat_memory_writer import ChatMemoryWriter
+
+
+class TestChatMemoryWriter:
+    """Test cases for ChatMemoryWriter"""
+    
+    @pytest.mark.asyncio
+    async def test_queued_messages_are_flushed(self, empty_temp_dir):
+        """Test queued messages for several projects are saved in order"""
+        memory = ChatMemory(Path(empty_temp_dir) / "ai_cli.db")
+        writer = ChatMemoryWriter(flush_delay=0)
+        
+        for i in range(3):
+            writer.enqueue(memory, 1, f"message {i}", f"reply {i}")
+        writer.enqueue(memory, 2, "other", "reply")
+        await writer.stop()
+        
+        assert [msg.message for msg in memory.get_project_history(1)] == ["message 0", "message 1", "message 2"]
+        assert memory.get_message_count(2) == 1
+    
+    @pytest.mark.asyncio
+    async def test_failed_batch_does_not_stop_worker(self, empty_temp_dir):
+        """Test the worker keeps running after a batch fails to save"""
+        memory = ChatMemory(Path(empty_temp_dir) / "ai_cli.db")
+        writer = ChatMemoryWriter(flush_delay=0)
+        
+        writer.enqueue(memory, 1, None, "reply")
+        await asyncio.sleep(0.1)
+        writer.enqueue(memory, 1, "message", "reply")
+        await writer.stop()
+        
+        assert [msg.message for msg in memory.get_project_history(1)] == ["message"]
+    
+    @pytest.mark.asyncio
+    async def test_failed_project_does_not_drop_others(self, empty_temp_dir):
+        """Test one project failing to save doesn't drop other projects in the batch"""
+        memory = ChatMemory(Path(empty_temp_dir) / "ai_cli.db")
+        writer = ChatMemoryWriter(flush_delay=0.05)
+        
+        writer.enqueue(memory, 1, None, "reply")
+        writer.enqueue(memory, 2, "kept", "reply")
+        await writer.stop()
+        
+        assert memory.get_project_history(1) == []
+        assert [msg.message for msg in memory.get_project_history(2)] == ["kept"]
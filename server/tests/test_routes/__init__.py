@@ -0,0 +1,3 @@
+"""
+Route tests package
+"""
@@ -0,0 +1,29 @@
+"""
+Tests for the chat route helpers
+"""
+
+import orjson
+
+from core.chat_manager import ConversationState, ConversationStep
+from routes.chat import _encode_step
+
+
+class TestEncodeStep:
+    """Test cases for SSE frame encoding"""
+    
+    def test_tool_result_with_int_key(self):
+        """Test tool results with non-string dict keys are encoded like json.dumps"""
+        step = ConversationStep(
+            state=ConversationState.TOOL_EXECUTING,
+            tool_results=[{"result": {1: "first line"}}]
+        )
+        
+        frame = _encode_step(step, "session-1")
+        
+        assert frame.startswith(b"data: ")
+        assert frame.endswith(b"\n\n")
+        data = orjson.loads(frame[len(b"data: "):-2])
+        assert data["type"] == "conversation_step"
+        assert data["state"] == "tool_executing"
+        assert data["tool_results"] == [{"result": {"1": "first line"}}]
+        assert data["session_id"] == "session-1"
@@ -0,0 +1,37 @@
+"""
+Tests for ToolManager
+"""
+
+import pytest
+
+from tools.tool_manager import ToolManager
+from tools.filesystem.read_file_tool import ReadFileTool
+from tools.filesystem.write_file_tool import WriteFileTool
+
+
+class TestToolManager:
+    """Test cases for ToolManager"""
+    
+    @pytest.fixture
+    def manager(self):
+        """Create ToolManager with one registered tool"""
+        manager = ToolManager()
+        manager.register_tool(ReadFileTool())
+        return manager
+    
+    def test_available_tools_reused(self, manager):
+        """Test that tool definitions are built once and then shared"""
+        tools = manager.get_available_tools()
+        
+        assert [tool.name for tool in tools] == ["read_file"]
+        assert manager.get_available_tools() is tools
+    
+    def test_available_tools_follow_registry(self, manager):
+        """Test that registering and unregistering tools refreshes definitions"""
+        manager.get_available_tools()
+        
+        manager.register_tool(WriteFileTool())
+        assert [tool.name for tool in manager.get_available_tools()] == ["read_file", "write_file"]
+        
+        manager.unregister_tool("read_file")
+        assert [tool.name for tool in manager.get_available_tools()] == ["write_file"]
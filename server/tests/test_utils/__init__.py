@@ -0,0 +1,3 @@
+"""
+Utility tests package
+"""
\ No newline at end of file
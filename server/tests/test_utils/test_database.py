@@ -0,0 +1,81 @@
+"""
+Tests for the shared SQLite connection pool
+"""
+
+import pytest
+from types import SimpleNamespace
+
+from utils import database
+from utils.database import ConnectionPool, invalidate_project_exists, project_exists
+
+
+class TestConnectionPool:
+    """Test cases for ConnectionPool"""
+    
+    @pytest.fixture
+    def pool(self, tmp_path):
+        """Create a pool on a temporary database"""
+        pool = ConnectionPool(tmp_path / "test.db", max_idle=1)
+        yield pool
+        pool.close()
+    
+    def test_connection_reused(self, pool):
+        """Test that a returned connection is handed out again"""
+        with pool.connection() as first:
+            assert pool.stats() == {"open": 1, "idle": 0, "in_use": 1}
+        with pool.connection() as second:
+            assert second is first
+        
+        assert pool.stats() == {"open": 1, "idle": 1, "in_use": 0}
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    
+    def test_extra_connections_closed(self, pool):
+        """Test that connections beyond max_idle are closed when returned"""
+        with pool.connection():
+            with pool.connection():
+                assert pool.stats() == {"open": 2, "idle": 0, "in_use": 2}
+        
+        assert pool.stats() == {"open": 1, "idle": 1, "in_use": 0}
+        
+        pool.close()
+        assert pool.stats() == {"open": 0, "idle": 0, "in_use": 0}
+
+
+class TestProjectExists:
+    """Test cases for the cached project existence check"""
+    
+    @pytest.fixture
+    def pool(self, tmp_path, monkeypatch):
+        """Point get_db at a temporary database with a projects table"""
+        pool = ConnectionPool(tmp_path / "test.db")
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY)")
+            conn.commit()
+        monkeypatch.setattr(database, "get_pool", lambda: pool)
+        monkeypatch.setattr(database, "_project_exists", {})
+        yield pool
+        pool.close()
+    
+    def test_cached_until_invalidated(self, pool):
+        """Test existence results are cached and refreshed by invalidation"""
+        assert project_exists(1) is False
+        
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO projects (id) VALUES (1)")
+            conn.commit()
+        assert project_exists(1) is False
+        
+        invalidate_project_exists(1)
+        assert project_exists(1) is True
+    
+    def test_cache_expires(self, pool, monkeypatch):
+        """Test cached results are rechecked once the TTL passes"""
+        now = [1000.0]
+        monkeypatch.setattr(database, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        assert project_exists(1) is False
+        
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO projects (id) VALUES (1)")
+            conn.commit()
+        now[0] += database._PROJECT_EXISTS_TTL
+        assert project_exists(1) is True
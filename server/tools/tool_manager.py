@@ -25,6 +25,9 @@ class ToolManager:
     def __init__(self):
         """Initialize the tool manager"""
         self.tools: Dict[str, BaseTool] = {}
+        # ToolDefinitions built from the registered tools' schemas; reset
+        # whenever the registry changes
+        self._tool_definitions: Optional[List['ToolDefinition']] = None
         self.logger = logging.getLogger(__name__)
     
     def register_tool(self, tool: BaseTool) -> None:
@@ -45,6 +48,7 @@ class ToolManager:
             raise ValueError(f"Tool '{tool_name}' is already registered")
         
         self.tools[tool_name] = tool
+        self._tool_definitions = None
         self.logger.info(f"Registered tool: {tool_name}")
     
     def unregister_tool(self, tool_name: str) -> bool:
@@ -59,6 +63,7 @@ class ToolManager:
         """
         if tool_name in self.tools:
             del self.tools[tool_name]
+            self._tool_definitions = None
             self.logger.info(f"Unregistered tool: {tool_name}")
             return True
         return False
@@ -180,9 +185,15 @@ class ToolManager:
         """
         Get available tools as ToolDefinition objects
         
+        The list is built once and shared by every caller until a tool is
+        registered or unregistered, so callers must not modify it.
+        
         Returns:
             List of ToolDefinition objects for all registered tools
         """
+        if self._tool_definitions is not None:
+            return self._tool_definitions
+        
         from core.base_types import ToolDefinition
         
         tool_definitions = []
@@ -195,6 +206,7 @@ class ToolManager:
             )
             tool_definitions.append(tool_def)
         
+        self._tool_definitions = tool_definitions
         return tool_definitions
     
     def get_enabled_tools_schema(self, enabled_tools: List[str]) -> List[Dict[str, Any]]:
@@ -0,0 +1 @@
+# Utilities package for AI CLI server
\ No newline at end of file
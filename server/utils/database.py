@@ -0,0 +1,183 @@
+"""
+Database Connections
+Pooled SQLite connections shared by the route modules
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import cache
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# Database setup
+DB_PATH = Path.home() / ".ai-cli" / "ai_cli.db"
+
+# Local ISO 8601 timestamp computed by SQLite, with millisecond precision;
+# 'now' is fixed for one statement, so repeating it in a statement yields
+# equal values
+SQL_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')"
+
+# Results of project existence checks with the time they were made; projects
+# are created and deleted rarely, and those routes invalidate their entry
+_PROJECT_EXISTS_TTL = 60.0
+_PROJECT_EXISTS_MAX = 1024
+_project_exists: Dict[int, Tuple[float, bool]] = {}
+
+
+class ConnectionPool:
+    """
+    Keeps opened SQLite connections around for reuse between requests
+
+    Connections are created on demand when the pool is empty, so callers
+    never block; at most max_idle of them are kept once they are returned.
+    """
+
+    def __init__(self, db_path: Path, max_idle: int = 4):
+        """
+        Initialize the pool (no connections are opened up front)
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_idle: Maximum number of idle connections kept for reuse
+        """
+        self.db_path = db_path
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=max_idle)
+        # Guards the open-connection count and the one-time WAL switch
+        # (journal_mode=WAL persists in the database file)
+        self._lock = threading.Lock()
+        self._open = 0
+        self._wal_enabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with row access by name and WAL PRAGMAs"""
+        in_memory = str(self.db_path) == ":memory:"
+        if not in_memory:
+            self.db_path.parent.mkdir(exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+
+        with self._lock:
+            self._open += 1
+            if not in_memory and not self._wal_enabled:
+                conn.execute("PRAGMA journal_mode=WAL")
+                self._wal_enabled = True
+
+        # NORMAL is safe in WAL mode and drops one fsync per commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Deleting a project cascades to its chat history and settings
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection; commits on success and rolls back on error
+
+        Yields:
+            sqlite3.Connection: Connection returned to the pool afterwards
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        try:
+            with conn:
+                yield conn
+        finally:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                self._close(conn)
+
+    def _close(self, conn: sqlite3.Connection):
+        """Close a connection that is leaving the pool"""
+        conn.close()
+        with self._lock:
+            self._open -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get connection counts for health checks
+
+        Returns:
+            Dict with open, idle and in_use connection counts
+        """
+        idle = self._idle.qsize()
+        return {"open": self._open, "idle": idle, "in_use": self._open - idle}
+
+    def close(self):
+        """Close every idle connection (borrowed ones close when returned)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+
+def fetch_row(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> Optional[tuple]:
+    """
+    Run a query and return its first row as a plain tuple
+
+    Uses a tuple cursor, skipping the sqlite3.Row wrapper (and its by-name
+    lookup) that pooled connections build for every other query.
+
+    Args:
+        conn: Connection to run the query on
+        sql: Query to run
+        params: Query parameters
+
+    Returns:
+        The first row, or None if no row matched
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor.execute(sql, params).fetchone()
+
+
+def project_exists(project_id: int) -> bool:
+    """
+    Check whether a project exists, cached for a short TTL
+
+    Args:
+        project_id: Project to check
+
+    Returns:
+        True if the project exists
+    """
+    now = time.monotonic()
+    hit = _project_exists.get(project_id)
+    if hit is not None and now - hit[0] < _PROJECT_EXISTS_TTL:
+        return hit[1]
+
+    with get_db() as conn:
+        exists = fetch_row(conn, "SELECT 1 FROM projects WHERE id = ?", (project_id,)) is not None
+
+    if len(_project_exists) >= _PROJECT_EXISTS_MAX:
+        _project_exists.clear()
+    _project_exists[project_id] = (now, exists)
+    return exists
+
+
+def invalidate_project_exists(project_id: int):
+    """Forget the cached existence check for a project after it was created or deleted"""
+    _project_exists.pop(project_id, None)
+
+
+@cache
+def get_pool() -> ConnectionPool:
+    """Get the global connection pool"""
+    return ConnectionPool(DB_PATH)
+
+
+def get_db():
+    """Get a pooled database connection (use as a context manager)"""
+    return get_pool().connection()
@@ -0,0 +1,18 @@
+"""
+ORJSON Response
+JSON response class that renders with orjson instead of the stdlib encoder
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson (non-string dict keys allowed, like json.dumps)"""
+    
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)